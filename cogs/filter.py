@@ -1,47 +1,87 @@
 import discord
 from discord.ext import commands
-from asgiref.sync import sync_to_async
+from db.access import db_call
 from db.models import BannedPhrase
+from utils.matcher import PhraseMatcher
+from utils import outbound, pipeline
+import asyncio
 import logging
 import os
 
 GUILD_ID = int(os.getenv("GUILD_ID"))
+# Reads the text of every guild message
+INTENTS = discord.Intents(guild_messages=True, message_content=True)
 
 class Filter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
+        # Compiled from the BannedPhrase table on first use and after every filter mutation
+        self.matcher = None
+        self._matcher_lock = asyncio.Lock()
+        bot.message_pipeline.add_stage("filter", self.filter_stage, pipeline.MODERATION)
 
-    @sync_to_async
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("filter")
+
+    @db_call
     def _get_phrases(self):
         return list(BannedPhrase.objects.values_list('phrase', flat=True))
 
-    @sync_to_async
+    @db_call
     def _add_phrase(self, phrase, user_id):
-        return BannedPhrase.objects.get_or_create(phrase=phrase.lower(), added_by=str(user_id))
+        return BannedPhrase.objects.get_or_create(phrase=phrase.lower(), added_by=user_id)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    @db_call
+    def _remove_phrase(self, phrase):
+        deleted, _ = BannedPhrase.objects.filter(phrase=phrase.lower()).delete()
+        return deleted > 0
 
-        if message.author.id == self.bot.user.id:
-            return
+    async def _rebuild_matcher(self, only_if_missing=False):
+        """Reload the banned phrases and compile them into a new matcher"""
+        async with self._matcher_lock:
+            # Messages that queued up behind the first compile find it done and don't read the table again
+            if only_if_missing and self.matcher is not None:
+                return
+            phrases = await self._get_phrases()
+            self.matcher = PhraseMatcher(phrases)
+            self.logger.info(f"Compiled word filter with {self.matcher.size} phrase(s)")
+
+    async def _get_matcher(self):
+        if self.matcher is None:
+            await self._rebuild_matcher(only_if_missing=True)
+        return self.matcher
+
+    async def filter_stage(self, ctx):
+        if ctx.from_self:
+            return False
 
+        matcher = await self._get_matcher()
 
-        banned_phrases = await self._get_phrases()
-        
-        content = message.content.lower()
-        if any(phrase in content for phrase in banned_phrases):
-            try:
-                await message.delete()
-            except discord.Forbidden:
-                self.logger.warning(f"Missing permissions to delete message in {message.channel.id}")
+        if not matcher.search(ctx.content):
+            return False
+        try:
+            await self.bot.outbound.submit(outbound.MODERATION, ctx.message.delete)
+        except discord.Forbidden:
+            self.logger.warning(f"Missing permissions to delete message in {ctx.message.channel.id}")
+        return True
 
 
     @discord.slash_command(description="Add a phrase to the word filter", guild_ids=[GUILD_ID])
     @discord.default_permissions(administrator=True)
     async def filter_add(self, ctx, phrase: str):
         await self._add_phrase(phrase, ctx.author.id)
+        await self._rebuild_matcher()
         await ctx.respond(f"Added `{phrase}` to the filter.")
 
+    @discord.slash_command(description="Remove a phrase from the word filter", guild_ids=[GUILD_ID])
+    @discord.default_permissions(administrator=True)
+    async def filter_remove(self, ctx, phrase: str):
+        if not await self._remove_phrase(phrase):
+            await ctx.respond(f"`{phrase}` is not in the filter.")
+            return
+        await self._rebuild_matcher()
+        await ctx.respond(f"Removed `{phrase}` from the filter.")
+
 def setup(bot):
     bot.add_cog(Filter(bot))
@@ -1,17 +1,27 @@
+import discord
 from discord.ext import commands
+from functools import partial
 from random import choice, randint
+from utils import outbound, pipeline
+
+# Chatters in guild channels and DMs
+INTENTS = discord.Intents(messages=True)
 
 class Miscellaneous(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-    
-    @commands.Cog.listener()
-    async def on_message(self, ctx):
-        if self.bot.user.id == ctx.author.id:
-            return
+        bot.message_pipeline.add_stage("misc", self.chatter_stage, pipeline.CHATTER)
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("misc")
+
+    async def chatter_stage(self, ctx):
+        if ctx.from_self:
+            return False
         if randint(0,512)==268:
             messages = ["david j sosa best developer on the planet.", "use tvii", "67", "it's 10 pm do you know where your tvii is?", "What the fuck", "I hate my job"]
-            await ctx.channel.send(choice(messages))
+            await self.bot.outbound.submit(outbound.COSMETIC, partial(ctx.message.channel.send, choice(messages)))
+        return False
 
 def setup(bot):
     bot.add_cog(Miscellaneous(bot))
\ No newline at end of file
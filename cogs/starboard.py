@@ -1,22 +1,81 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, pages
+import asyncio
+import math
+from functools import partial
 import os
+from datetime import datetime
 import logging
-from asgiref.sync import sync_to_async
-from db.models import StarboardMessage
+from db.access import db_call
+from django.db import transaction
+from db.models import StarboardCheckpoint, StarboardMessage, Stargazer
+from db.write_behind import WriteBehind
+from utils import metrics, outbound, pipeline
+from utils.keyed_lock import KeyedLock
+from utils.ranking import Leaderboard
+from utils.rate_limit import TokenBucket
 
 STAR_THRESHOLD = int(os.getenv("STAR_THRESHOLD"))  # Change how many ⭐ are required
 GUILD_ID = int(os.getenv("GUILD_ID"))
+# Star reactions, edits of starred messages and their text for the posted embeds
+INTENTS = discord.Intents(guild_messages=True, guild_reactions=True, message_content=True)
+STARBOARD_EDIT_DELAY = float(os.getenv("STARBOARD_EDIT_DELAY", "5"))  # Seconds to collect star changes before editing a post
+STARBOARD_WRITE_INTERVAL = float(os.getenv("STARBOARD_WRITE_INTERVAL", "10"))  # Seconds between writes of changed star counts
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_MAX_PAGES = 10
+# Channel IDs the backfill scans, every readable text channel when empty
+STARBOARD_BACKFILL_CHANNELS = [int(channel_id) for channel_id in os.getenv("STARBOARD_BACKFILL_CHANNELS", "").split(",") if channel_id.strip()]
+STARBOARD_BACKFILL_ON_STARTUP = os.getenv("STARBOARD_BACKFILL_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+STARBOARD_BACKFILL_CONCURRENCY = int(os.getenv("STARBOARD_BACKFILL_CONCURRENCY", "2"))
+STARBOARD_BACKFILL_RATE = float(os.getenv("STARBOARD_BACKFILL_RATE", "2"))  # REST requests per second
+BACKFILL_BATCH_SIZE = 100  # One page of channel history
+
+EDIT_REQUESTS = metrics.counter("starboard_edit_requests_total", "Star count changes that needed a starboard post edit")
+EDITS_SENT = metrics.counter("starboard_edits_total", "Starboard post edits sent to Discord")
+EDITS_COALESCED = metrics.counter("starboard_edits_coalesced_total", "Starboard post edits saved by merging them into a pending edit")
+BACKFILL_SCANNED = metrics.counter("starboard_backfill_scanned_total", "Messages read from channel history by the starboard backfill")
+BACKFILL_RECONCILED = metrics.counter("starboard_backfill_reconciled_total", "Messages re-counted by the starboard backfill")
 
 class Starboard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
+        bot.message_pipeline.add_stage("starboard", self.starboard_stage, pipeline.BOT_MESSAGES)
+        # Latest star count per original message ID waiting for its edit window to close
+        self._pending_updates = {}
+        self._update_tasks = {}
+        # Star counts of entries by primary key, written together instead of on every edit
+        self.star_writes = WriteBehind("starboard stars", StarboardMessage, STARBOARD_WRITE_INTERVAL)
+        # Serializes all work on one original message ID, different messages still run in parallel
+        self._message_locks = KeyedLock()
+        # Built from the database once, then kept up to date on every star change
+        self.leaderboard = None
+        self._leaderboard_lock = asyncio.Lock()
+        self._backfill_task = None
+        self._backfill_started = False
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage("starboard")
+        if self._backfill_task:
+            self._backfill_task.cancel()
+        self.star_writes.stop()
+        if self._pending_updates or len(self.star_writes):
+            asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Send every pending starboard edit now instead of waiting for its window, then write the star counts"""
+        for task in self._update_tasks.values():
+            task.cancel()
+        self._update_tasks.clear()
+        pending, self._pending_updates = self._pending_updates, {}
+        for message_id, star_count in pending.items():
+            await self.update_starboard_message(message_id, star_count)
+        await self.star_writes.flush()
 
     # ------------------------
     # Database Helper Methods
     # ------------------------
-    @sync_to_async
+    @db_call
     def _get_starboard_entry(self, message_id):
         """Get a starboard entry from the database"""
         try:
@@ -24,36 +83,38 @@ class Starboard(commands.Cog):
         except StarboardMessage.DoesNotExist:
             return None
 
-    @sync_to_async
+    @db_call
     def _get_starboard_entry_by_starboard_id(self, starboard_message_id):
         """Get a starboard entry by its starboard message ID"""
-        try:
-            return StarboardMessage.objects.filter(starboard_message_id=starboard_message_id).first()
-        except:
-            return None
+        return StarboardMessage.objects.filter(starboard_message_id=starboard_message_id).first()
 
-    @sync_to_async
-    def _create_starboard_entry(self, message_id, starboard_message_id, channel_id, stars):
-        """Create a new starboard entry"""
-        return StarboardMessage.objects.create(
-            message_id=message_id,
-            starboard_message_id=starboard_message_id,
-            channel_id=channel_id,
-            stars=stars
-        )
+    @db_call
+    def _create_starboard_entry(self, message_id, starboard_message_id, channel_id, stars, author_id=None, render=None, source_edited_at=None):
+        """Create a starboard entry, or point an existing one for the same message at the new post
 
-    @sync_to_async
-    def _update_starboard_entry(self, message_id, stars):
-        """Update a starboard entry's star count"""
-        try:
-            entry = StarboardMessage.objects.get(message_id=message_id)
-            entry.stars = stars
-            entry.save()
-            return entry
-        except StarboardMessage.DoesNotExist:
-            return None
+        Returns the starboard message ID that was replaced, if any.
+        """
+        with transaction.atomic():
+            previous = StarboardMessage.objects.select_for_update().filter(message_id=message_id).first()
+            StarboardMessage.objects.update_or_create(
+                message_id=message_id,
+                defaults=dict(
+                    starboard_message_id=starboard_message_id,
+                    channel_id=channel_id,
+                    author_id=author_id,
+                    stars=stars,
+                    render=render,
+                    source_edited_at=source_edited_at
+                )
+            )
+        return previous.starboard_message_id if previous else None
+
+    @db_call
+    def _save_starboard_render(self, message_id, author_id, render, source_edited_at):
+        """Store the embed snapshot of a starboard entry"""
+        StarboardMessage.objects.filter(message_id=message_id).update(author_id=author_id, render=render, source_edited_at=source_edited_at)
 
-    @sync_to_async
+    @db_call
     def _delete_starboard_entry(self, message_id):
         """Delete a starboard entry"""
         try:
@@ -62,9 +123,54 @@ class Starboard(commands.Cog):
         except StarboardMessage.DoesNotExist:
             return False
         
-    @sync_to_async
-    def _get_top_starboard_entries(self):
-        return list(StarboardMessage.objects.all().order_by("-stars")[:6])
+    @db_call
+    def _get_ranked_entries(self):
+        """Get the fields the leaderboard is built from for every starboard entry"""
+        return list(StarboardMessage.objects.values_list("id", "message_id", "channel_id", "author_id", "starboard_message_id", "stars"))
+
+    def _count_stargazers_sync(self, message_id):
+        return Stargazer.objects.filter(message_id=message_id).values("user_id").distinct().count()
+
+    @db_call
+    def _add_stargazer(self, message_id, user_id, on_starboard):
+        """Record a star from a user and return the message's new star count"""
+        Stargazer.objects.get_or_create(message_id=message_id, user_id=user_id, on_starboard=on_starboard)
+        return self._count_stargazers_sync(message_id)
+
+    @db_call
+    def _remove_stargazer(self, message_id, user_id, on_starboard):
+        """Remove a user's star and return the message's new star count"""
+        Stargazer.objects.filter(message_id=message_id, user_id=user_id, on_starboard=on_starboard).delete()
+        return self._count_stargazers_sync(message_id)
+
+    @db_call
+    def _clear_stargazers(self, message_id, on_starboard):
+        """Remove all stars on one side of a message and return its new star count"""
+        Stargazer.objects.filter(message_id=message_id, on_starboard=on_starboard).delete()
+        return self._count_stargazers_sync(message_id)
+
+    @db_call
+    def _replace_stargazers(self, message_id, user_ids, on_starboard):
+        """Overwrite the stored stars on one side of a message"""
+        with transaction.atomic():
+            Stargazer.objects.filter(message_id=message_id, on_starboard=on_starboard).delete()
+            Stargazer.objects.bulk_create([
+                Stargazer(message_id=message_id, user_id=user_id, on_starboard=on_starboard)
+                for user_id in user_ids
+            ])
+
+    @db_call
+    def _count_stargazers(self, message_id):
+        return self._count_stargazers_sync(message_id)
+
+    @db_call
+    def _get_backfill_checkpoint(self, channel_id):
+        """Get the newest message ID already reconciled in a channel"""
+        return StarboardCheckpoint.objects.filter(channel_id=channel_id).values_list("last_message_id", flat=True).first()
+
+    @db_call
+    def _save_backfill_checkpoint(self, channel_id, last_message_id):
+        StarboardCheckpoint.objects.update_or_create(channel_id=channel_id, defaults=dict(last_message_id=last_message_id))
 
     # ------------------------
     # Forward preview helper
@@ -86,7 +192,7 @@ class Starboard(commands.Cog):
                 chan = current_guild.get_channel(int(channel_id))
             if chan:
                 try:
-                    fmsg = await chan.fetch_message(int(message_id))
+                    fmsg = await self.bot.message_cache.fetch(chan, message_id)
                 except Exception as e:
                     # Non-fatal: forwarding preview couldn't fetch the message in-channel
                     self.logger.debug(f"Error fetching forwarded message: {e}")
@@ -219,7 +325,7 @@ class Starboard(commands.Cog):
         
         if is_reply:
             try:
-                replied_msg = await message.channel.fetch_message(message.reference.message_id)
+                replied_msg = await self.bot.message_cache.fetch(message.channel, message.reference.message_id)
                 
                 # Check if the replied message is itself a forwarded message
                 replied_is_forward = (replied_msg.reference and replied_msg.reference.message_id and replied_msg.type != discord.MessageType.reply)
@@ -415,238 +521,542 @@ class Starboard(commands.Cog):
         return embeds
 
     async def update_starboard_message(self, message_id, star_count):
-        """Update an existing starboard message with new star count"""
-        message_id_str = str(message_id)
+        """Update an existing starboard message with new star count
+
+        The message's lock is held while the count is stored but not while the edit
+        waits in the outbound queue, so a newer count for the same post replaces it there.
+        """
+        edit = None
+        async with self._message_locks(message_id):
+            starboard_entry = await self._get_starboard_entry(message_id)
+            if not starboard_entry:
+                return
+
+            guild = self.bot.get_guild(GUILD_ID)
+            if not guild:
+                return
+
+            starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
+            if not starboard_channel:
+                return
 
-        starboard_entry = await self._get_starboard_entry(message_id_str)
-        if not starboard_entry:
+            try:
+                if starboard_entry.render is None:
+                    # Entries posted before render snapshots were stored get one full re-render
+                    if not await self.render_starboard_message(guild, starboard_entry, star_count):
+                        return
+                    EDITS_SENT.inc()
+
+                await self.star_writes.put(starboard_entry.id, stars=star_count)
+                await self._rank_entry(starboard_entry, star_count)
+
+                if starboard_entry.render is not None:
+                    # Only the header line depends on the count, Discord keeps the posted embeds
+                    jump_url = f"https://discord.com/channels/{guild.id}/{starboard_entry.channel_id}/{message_id}"
+                    starboard_msg = starboard_channel.get_partial_message(starboard_entry.starboard_message_id)
+                    edit = self.bot.outbound.submit(
+                        outbound.COSMETIC,
+                        partial(self._edit_star_count, starboard_msg, f"⭐ **{star_count}** - {jump_url}"),
+                        key=("starboard count", starboard_msg.id)
+                    )
+            except discord.NotFound:
+                await self._drop_starboard_entry(starboard_entry)
+                return
+            except Exception as e:
+                self.logger.exception(f"Error updating starboard message: {e}")
+                return
+
+        if edit is None:
             return
+        try:
+            await edit
+        except discord.NotFound:
+            async with self._message_locks(message_id):
+                await self._drop_starboard_entry(starboard_entry)
+        except Exception as e:
+            self.logger.exception(f"Error updating starboard message: {e}")
 
-        starboard_msg_id = starboard_entry.starboard_message_id
-        
-        guild = self.bot.get_guild(GUILD_ID)
-        if not guild:
+    async def _edit_star_count(self, starboard_msg, content):
+        # Counted here rather than by the callers, an edit that replaced others is sent once
+        EDITS_SENT.inc()
+        return await starboard_msg.edit(content=content)
+
+    async def _drop_starboard_entry(self, starboard_entry):
+        """Forget a starboard entry whose post is gone, along with the stars that post had"""
+        self.star_writes.discard(starboard_entry.id)
+        await self._delete_starboard_entry(starboard_entry.message_id)
+        # A deleted post sends no reaction removals, its stars would otherwise keep counting
+        await self._clear_stargazers(starboard_entry.message_id, True)
+        await self._unrank_entry(starboard_entry.message_id)
+
+    async def render_starboard_message(self, guild, starboard_entry, star_count=None):
+        """Rebuild the embeds of a starboard post from the original message and store the snapshot
+
+        The content line is only rewritten when a star count is given.
+        """
+        starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
+        original_channel = guild.get_channel(starboard_entry.channel_id)
+        if not starboard_channel or not original_channel:
+            return False
+
+        original_msg = await self.bot.message_cache.fetch(original_channel, starboard_entry.message_id)
+        embeds = await self.create_starboard_embeds(original_msg)
+
+        starboard_msg = starboard_channel.get_partial_message(starboard_entry.starboard_message_id)
+        if star_count is None:
+            await self.bot.outbound.submit(outbound.COSMETIC, partial(starboard_msg.edit, embeds=embeds))
+        else:
+            await self.bot.outbound.submit(outbound.COSMETIC, partial(starboard_msg.edit, content=f"⭐ **{star_count}** - {original_msg.jump_url}", embeds=embeds))
+
+        await self._save_starboard_render(starboard_entry.message_id, original_msg.author.id, [embed.to_dict() for embed in embeds], original_msg.edited_at)
+        starboard_entry.author_id = original_msg.author.id
+        return True
+
+    # ------------------------
+    # Leaderboard
+    # ------------------------
+    async def _get_leaderboard(self):
+        """Return the leaderboard, building it from the database on first use"""
+        async with self._leaderboard_lock:
+            if self.leaderboard is None:
+                leaderboard = Leaderboard()
+                for pk, message_id, channel_id, author_id, starboard_message_id, stars in await self._get_ranked_entries():
+                    # Counts still waiting in the write buffer are newer than the database
+                    stars = (self.star_writes.pending(pk) or {}).get("stars", stars)
+                    created_at = discord.utils.snowflake_time(message_id).timestamp()
+                    leaderboard.update(message_id, stars, created_at, author_id, channel_id, starboard_message_id)
+                self.leaderboard = leaderboard
+        return self.leaderboard
+
+    async def _rank_entry(self, starboard_entry, star_count):
+        leaderboard = await self._get_leaderboard()
+        created_at = discord.utils.snowflake_time(starboard_entry.message_id).timestamp()
+        leaderboard.update(starboard_entry.message_id, star_count, created_at, starboard_entry.author_id, starboard_entry.channel_id, starboard_entry.starboard_message_id)
+
+    async def _unrank_entry(self, message_id):
+        leaderboard = await self._get_leaderboard()
+        leaderboard.remove(message_id)
+
+    def schedule_starboard_update(self, message_id, star_count):
+        """Queue a star count edit, merging it into the edit already waiting for this message"""
+        EDIT_REQUESTS.inc()
+        if message_id in self._pending_updates:
+            EDITS_COALESCED.inc()
+        self._pending_updates[message_id] = star_count
+        if message_id not in self._update_tasks:
+            self._update_tasks[message_id] = asyncio.create_task(self._delayed_update(message_id))
+
+    def _cancel_starboard_update(self, message_id):
+        task = self._update_tasks.pop(message_id, None)
+        if task:
+            task.cancel()
+        self._pending_updates.pop(message_id, None)
+
+    async def _delayed_update(self, message_id):
+        await asyncio.sleep(STARBOARD_EDIT_DELAY)
+        # Leave the task map before editing so flush() never cancels an edit halfway
+        self._update_tasks.pop(message_id, None)
+        star_count = self._pending_updates.pop(message_id, None)
+        if star_count is not None:
+            await self.update_starboard_message(message_id, star_count)
+
+    async def _fetch_star_users(self, channel, message_id, message=None):
+        """Page through the users who starred a message, None if it can't be fetched"""
+        try:
+            # Always fetched fresh, cached copies don't track reaction changes
+            if message is None:
+                message = await channel.fetch_message(message_id)
+            users = set()
+            for reaction in message.reactions:
+                if str(reaction.emoji) == "⭐":
+                    async for user in reaction.users():
+                        if not user.bot:
+                            users.add(user.id)
+            return users
+        except discord.HTTPException:
+            return None
+
+    async def reconcile_stargazers(self, guild, channel_id, message_id, original_msg=None):
+        """Re-count the stars of a message from Discord and overwrite the stored stargazers
+
+        This pages through the reaction users of both the original and the starboard
+        message, so it only runs on explicit reconciliation.
+        """
+        original_channel = guild.get_channel(channel_id)
+        if original_channel:
+            users = await self._fetch_star_users(original_channel, message_id, original_msg)
+            if users is not None:
+                await self._replace_stargazers(message_id, users, False)
+
+        starboard_entry = await self._get_starboard_entry(message_id)
+        starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
+        if starboard_entry and starboard_channel:
+            users = await self._fetch_star_users(starboard_channel, starboard_entry.starboard_message_id)
+            if users is not None:
+                await self._replace_stargazers(message_id, users, True)
+
+        return await self._count_stargazers(message_id)
+
+    async def apply_star_count(self, guild, channel_id, message_id, star_count, reconciled=False):
+        """Create, update or remove the starboard post of a message for its star count"""
+        starboard_entry = await self._get_starboard_entry(message_id)
+        if starboard_entry and star_count < STAR_THRESHOLD and not reconciled:
+            # Entries posted before stargazers were tracked have no stored stars,
+            # so confirm with a full re-count before taking a post down
+            star_count = await self.reconcile_stargazers(guild, channel_id, message_id)
+
+        if starboard_entry:
+            if star_count >= STAR_THRESHOLD:
+                self.schedule_starboard_update(message_id, star_count)
+            else:
+                self._cancel_starboard_update(message_id)
+                await self._remove_starboard_post(guild, starboard_entry)
             return
 
+        if star_count >= STAR_THRESHOLD:
+            await self._post_to_starboard(guild, channel_id, message_id, star_count)
+
+    async def _post_to_starboard(self, guild, channel_id, message_id, star_count):
+        """Post a message that crossed the threshold to the starboard"""
+        channel = guild.get_channel(channel_id)
         starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
-        if not starboard_channel:
+        if not channel or not starboard_channel:
             return
 
         try:
-            starboard_msg = await starboard_channel.fetch_message(int(starboard_msg_id))
-            original_channel = guild.get_channel(int(starboard_entry.channel_id))
-            
-            if original_channel:
-                original_msg = await original_channel.fetch_message(int(message_id_str))
-                
-                content = f"⭐ **{star_count}** - {original_msg.jump_url}"
-                embeds = await self.create_starboard_embeds(original_msg)
-                
-                await starboard_msg.edit(content=content, embeds=embeds)
-                
-                await self._update_starboard_entry(message_id_str, star_count)
+            message = await self.bot.message_cache.fetch(channel, message_id)
         except discord.NotFound:
-            await self._delete_starboard_entry(message_id_str)
-        except Exception as e:
-            self.logger.exception(f"Error updating starboard message: {e}")
+            return
 
-    async def get_unique_starred_users(self, guild, message_id):
-        """Get unique users who starred from both original and starboard messages"""
-        unique_users = set()
-        
-        message_id_str = str(message_id)
-        
-        starboard_entry = await self._get_starboard_entry(message_id_str)
-        if not starboard_entry:
-            return unique_users
-        
-        # Get stars from original message
-        try:
-            original_channel = guild.get_channel(int(starboard_entry.channel_id))
-            if original_channel:
-                original_msg = await original_channel.fetch_message(int(message_id_str))
-                for reaction in original_msg.reactions:
-                    if str(reaction.emoji) == "⭐":
-                        async for user in reaction.users():
-                            if not user.bot:
-                                unique_users.add(user.id)
-        except:
-            pass
-        
-        # Get stars from starboard message
+        content = f"⭐ **{star_count}** - {message.jump_url}"
+        embeds = await self.create_starboard_embeds(message)
+
+        sent = await self.bot.outbound.submit(outbound.COSMETIC, partial(starboard_channel.send, content=content, embeds=embeds))
+
+        replaced = await self._create_starboard_entry(
+            message_id=message.id,
+            starboard_message_id=sent.id,
+            channel_id=channel.id,
+            author_id=message.author.id,
+            stars=star_count,
+            render=[embed.to_dict() for embed in embeds],
+            source_edited_at=message.edited_at
+        )
+        # Another process posted this message first, keep only the newest post
+        if replaced and replaced != sent.id:
+            try:
+                await self.bot.outbound.submit(outbound.COSMETIC, starboard_channel.get_partial_message(replaced).delete)
+            except discord.HTTPException:
+                pass
+
+        leaderboard = await self._get_leaderboard()
+        leaderboard.update(message.id, star_count, message.created_at.timestamp(), message.author.id, channel.id, sent.id)
+
+    async def _remove_starboard_post(self, guild, starboard_entry):
+        """Delete a starboard post that fell below the threshold"""
         try:
             starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
             if starboard_channel:
-                starboard_msg_id = starboard_entry.starboard_message_id
-                if starboard_msg_id:
-                    starboard_msg = await starboard_channel.fetch_message(int(starboard_msg_id))
-                    for reaction in starboard_msg.reactions:
-                        if str(reaction.emoji) == "⭐":
-                            async for user in reaction.users():
-                                if not user.bot:
-                                    unique_users.add(user.id)
-        except:
-            pass
-        
-        return unique_users
-
-    # ------------------------
-    # Reaction Listeners
-    # ------------------------
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Auto-add star to new starboard entries"""
-        if type(message.channel) != discord.DMChannel:
-            if message.channel.name == "starboard" and message.author == self.bot.user:
-                try:
-                    await message.add_reaction("⭐")
-                except:
-                    pass
+                await self.bot.outbound.submit(outbound.COSMETIC, starboard_channel.get_partial_message(starboard_entry.starboard_message_id).delete)
+        except discord.HTTPException as e:
+            self.logger.debug(f"Could not delete starboard post {starboard_entry.starboard_message_id}: {e}")
 
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
-        if str(payload.emoji) != "⭐":
-            return
+        await self._drop_starboard_entry(starboard_entry)
 
+    async def _resolve_star_target(self, payload):
+        """Return the guild, channel ID, message ID and side of the original message a ⭐ reaction counts towards"""
         guild = self.bot.get_guild(payload.guild_id)
         if not guild or payload.guild_id != GUILD_ID:
-            return
+            return None
 
         channel = guild.get_channel(payload.channel_id)
         if not channel:
-            return
+            return None
 
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.NotFound:
-            return
-        
-        # Check if reaction is on starboard message
+        # Stars on a starboard post count towards the original message
         if channel.name == "starboard":
-            starboard_entry = await self._get_starboard_entry_by_starboard_id(str(payload.message_id))
-            
-            if starboard_entry:
-                original_message_id = starboard_entry.message_id
-                unique_users = await self.get_unique_starred_users(guild, int(original_message_id))
-                star_count = len(unique_users)
-                await self.update_starboard_message(int(original_message_id), star_count)
-            return
+            starboard_entry = await self._get_starboard_entry_by_starboard_id(payload.message_id)
+            if not starboard_entry:
+                return None
+            return guild, starboard_entry.channel_id, starboard_entry.message_id, True
 
-        message_id = str(message.id)
+        return guild, channel.id, payload.message_id, False
 
-        # Check if already on starboard
-        starboard_entry = await self._get_starboard_entry(message_id)
-        if starboard_entry:
-            unique_users = await self.get_unique_starred_users(guild, int(message_id))
-            star_count = len(unique_users)
-            await self.update_starboard_message(payload.message_id, star_count)
-            return
+    # ------------------------
+    # Backfill
+    # ------------------------
+    def _backfill_channels(self, guild):
+        if STARBOARD_BACKFILL_CHANNELS:
+            channels = [guild.get_channel(channel_id) for channel_id in STARBOARD_BACKFILL_CHANNELS]
+        else:
+            channels = guild.text_channels
+        return [
+            channel for channel in channels
+            if isinstance(channel, discord.TextChannel) and channel.name != "starboard"
+            and channel.permissions_for(guild.me).read_message_history
+        ]
+
+    def start_backfill(self, guild, channels, restart=False):
+        """Run the backfill in the background, returns False if one is already running"""
+        if self._backfill_task and not self._backfill_task.done():
+            return False
+        self._backfill_task = asyncio.create_task(self.backfill(guild, channels, restart))
+        return True
+
+    async def backfill(self, guild, channels, restart=False):
+        """Scan channel history for starred messages and reconcile them with the database
+
+        Progress is checkpointed per channel after every page of history, so an
+        interrupted run resumes where it stopped unless restart is set.
+        """
+        bucket = TokenBucket(STARBOARD_BACKFILL_RATE)
+        semaphore = asyncio.Semaphore(STARBOARD_BACKFILL_CONCURRENCY)
+        reconciled = 0
+        try:
+            for channel in channels:
+                # One channel failing leaves its checkpoint where it stopped, the others still run
+                try:
+                    reconciled += await self._backfill_channel(guild, channel, bucket, semaphore, restart)
+                except Exception as e:
+                    self.logger.exception(f"Starboard backfill of {channel.id} failed: {e}")
+        except asyncio.CancelledError:
+            self.logger.info("Starboard backfill cancelled")
+            raise
+        self.logger.info(f"Starboard backfill reconciled {reconciled} message(s) in {len(channels)} channel(s)")
+        return reconciled
 
-        # New starboard entry
-        star_count = 0
+    async def _backfill_channel(self, guild, channel, bucket, semaphore, restart):
+        checkpoint = None if restart else await self._get_backfill_checkpoint(channel.id)
+        after = discord.Object(checkpoint) if checkpoint else None
+        reconciled = 0
+        batch = []
+
+        await bucket.acquire()
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            BACKFILL_SCANNED.inc()
+            batch.append(message)
+            if len(batch) == BACKFILL_BATCH_SIZE:
+                reconciled += await self._backfill_batch(guild, channel, batch, bucket, semaphore)
+                batch = []
+                # The next page of history is another request
+                await bucket.acquire()
+        if batch:
+            reconciled += await self._backfill_batch(guild, channel, batch, bucket, semaphore)
+        return reconciled
+
+    async def _backfill_batch(self, guild, channel, messages, bucket, semaphore):
+        leaderboard = await self._get_leaderboard()
+        # Messages already on the starboard are re-counted too, their stars may have dropped
+        candidates = [
+            message for message in messages
+            if self._star_reaction_count(message) >= STAR_THRESHOLD or leaderboard.info(message.id)
+        ]
+        results = await asyncio.gather(
+            *(self._backfill_message(guild, channel, message, bucket, semaphore) for message in candidates),
+            return_exceptions=True
+        )
+        failed = []
+        for message, result in zip(candidates, results):
+            if isinstance(result, Exception):
+                failed.append(message)
+                self.logger.warning(f"Starboard backfill could not reconcile {message.id} in {channel.id}: {result}")
+        if failed:
+            # Only checkpoint up to the first failure so the next run retries it, and stop
+            # here since any later page would move the checkpoint past it again
+            done = messages[:messages.index(failed[0])]
+            if done:
+                await self._save_backfill_checkpoint(channel.id, done[-1].id)
+            raise RuntimeError(f"{len(failed)} message(s) could not be reconciled, resuming from {failed[0].id} next run")
+        await self._save_backfill_checkpoint(channel.id, messages[-1].id)
+        return len(candidates)
+
+    async def _backfill_message(self, guild, channel, message, bucket, semaphore):
+        async with semaphore:
+            # One page of users per 100 stars on both the original and the starboard post, plus fetching the post
+            await bucket.acquire(1 + 2 * max(1, math.ceil(self._star_reaction_count(message) / 100)))
+            async with self._message_locks(message.id):
+                star_count = await self.reconcile_stargazers(guild, channel.id, message.id, original_msg=message)
+                await self.apply_star_count(guild, channel.id, message.id, star_count, reconciled=True)
+            BACKFILL_RECONCILED.inc()
+
+    def _star_reaction_count(self, message):
         for reaction in message.reactions:
             if str(reaction.emoji) == "⭐":
-                star_count = reaction.count
-                break
-        else:
+                return reaction.count
+        return 0
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after every reconnect, only backfill once per process
+        if not STARBOARD_BACKFILL_ON_STARTUP or self._backfill_started:
+            return
+        guild = self.bot.get_guild(GUILD_ID)
+        if not guild:
             return
+        self._backfill_started = True
+        self.start_backfill(guild, self._backfill_channels(guild))
 
-        if star_count < STAR_THRESHOLD:
+    # ------------------------
+    # Message Stage
+    # ------------------------
+    async def starboard_stage(self, ctx):
+        """Auto-add star to new starboard entries"""
+        if ctx.is_dm or not ctx.from_self or ctx.message.channel.name != "starboard":
+            return False
+        try:
+            await self.bot.outbound.submit(outbound.COSMETIC, partial(ctx.message.add_reaction, "⭐"))
+        except discord.HTTPException as e:
+            self.logger.debug(f"Could not star starboard post {ctx.message.id}: {e}")
+        return True
+
+    # ------------------------
+    # Reaction Listeners
+    # ------------------------
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if str(payload.emoji) != "⭐":
+            return
+        if payload.user_id == self.bot.user.id or (payload.member and payload.member.bot):
             return
 
-        starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
-        if not starboard_channel:
+        target = await self._resolve_star_target(payload)
+        if not target:
             return
-        content = f"⭐ **{star_count}** - {message.jump_url}"
-        embeds = await self.create_starboard_embeds(message)
-        
-        sent = await starboard_channel.send(content=content, embeds=embeds)
+        guild, channel_id, message_id, on_starboard = target
 
-        await self._create_starboard_entry(
-            message_id=message_id,
-            starboard_message_id=str(sent.id),
-            channel_id=str(channel.id),
-            stars=star_count
-        )
+        async with self._message_locks(message_id):
+            star_count = await self._add_stargazer(message_id, payload.user_id, on_starboard)
+            await self.apply_star_count(guild, channel_id, message_id, star_count)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
         if str(payload.emoji) != "⭐":
             return
+        if payload.user_id == self.bot.user.id:
+            return
 
-        guild = self.bot.get_guild(payload.guild_id)
-        if not guild or payload.guild_id != GUILD_ID:
+        target = await self._resolve_star_target(payload)
+        if not target:
             return
+        guild, channel_id, message_id, on_starboard = target
 
-        channel = guild.get_channel(payload.channel_id)
-        if not channel:
+        async with self._message_locks(message_id):
+            star_count = await self._remove_stargazer(message_id, payload.user_id, on_starboard)
+            await self.apply_star_count(guild, channel_id, message_id, star_count)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        await self._clear_stars(payload)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        if str(payload.emoji) == "⭐":
+            await self._clear_stars(payload)
+
+    async def _clear_stars(self, payload):
+        target = await self._resolve_star_target(payload)
+        if not target:
             return
-        
-        # Check if removal is on starboard message
-        if channel.name == "starboard":
-            starboard_entry = await self._get_starboard_entry_by_starboard_id(str(payload.message_id))
-            
-            if starboard_entry:
-                original_message_id = starboard_entry.message_id
-                unique_users = await self.get_unique_starred_users(guild, int(original_message_id))
-                star_count = len(unique_users)
-                
-                if star_count >= STAR_THRESHOLD:
-                    await self.update_starboard_message(int(original_message_id), star_count)
-                else:
-                    try:
-                        starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
-                        if starboard_channel:
-                            starboard_msg_id = starboard_entry.starboard_message_id
-                            starboard_msg = await starboard_channel.fetch_message(int(starboard_msg_id))
-                            await starboard_msg.delete()
-                    except:
-                        pass
-                    
-                    await self._delete_starboard_entry(original_message_id)
+        guild, channel_id, message_id, on_starboard = target
+
+        async with self._message_locks(message_id):
+            star_count = await self._clear_stargazers(message_id, on_starboard)
+            await self.apply_star_count(guild, channel_id, message_id, star_count)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        """Re-render a starboard post when its original message was edited"""
+        if payload.guild_id != GUILD_ID:
             return
 
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.NotFound:
+        # Embed unfurls also arrive as edits but leave edited_timestamp unchanged
+        edited_timestamp = payload.data.get("edited_timestamp")
+        if not edited_timestamp:
             return
 
-        message_id = str(message.id)
+        # Most edits are to messages that never made the starboard, the leaderboard
+        # holds every entry so they can be skipped without the lock or the database
+        leaderboard = await self._get_leaderboard()
+        if not leaderboard.info(payload.message_id):
+            return
 
-        starboard_entry = await self._get_starboard_entry(message_id)
-        if not starboard_entry:
+        guild = self.bot.get_guild(GUILD_ID)
+        if not guild:
             return
 
-        unique_users = await self.get_unique_starred_users(guild, int(message_id))
-        star_count = len(unique_users)
-        
-        if star_count >= STAR_THRESHOLD:
-            await self.update_starboard_message(payload.message_id, star_count)
-        else:
+        async with self._message_locks(payload.message_id):
+            starboard_entry = await self._get_starboard_entry(payload.message_id)
+            if not starboard_entry:
+                return
+            edited_at = datetime.fromisoformat(edited_timestamp)
+            if starboard_entry.source_edited_at and starboard_entry.source_edited_at >= edited_at:
+                return
+
+            self.bot.message_cache.invalidate(payload.message_id)
             try:
-                starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
-                if starboard_channel:
-                    starboard_msg_id = starboard_entry.starboard_message_id
-                    starboard_msg = await starboard_channel.fetch_message(int(starboard_msg_id))
-                    await starboard_msg.delete()
-            except:
+                await self.render_starboard_message(guild, starboard_entry)
+            except discord.NotFound:
                 pass
-            
-            await self._delete_starboard_entry(message_id)
-    
-    @commands.slash_command(description="Get the top 6 of the starboard!")
-    async def starboard(self, ctx):
+            except Exception as e:
+                self.logger.exception(f"Error re-rendering starboard message: {e}")
+
+    @discord.slash_command(description="Re-count the stars of a message from Discord", guild_ids=[GUILD_ID])
+    @discord.default_permissions(administrator=True)
+    async def starboard_reconcile(self, ctx, channel: discord.Option(discord.TextChannel), message_id: discord.Option(str)):
+        if not message_id.isdigit():
+            await ctx.respond("You have not set a valid message ID.")
+            return
+        await ctx.defer()
+        async with self._message_locks(int(message_id)):
+            star_count = await self.reconcile_stargazers(ctx.guild, channel.id, int(message_id))
+            await self.apply_star_count(ctx.guild, channel.id, int(message_id), star_count, reconciled=True)
+        await ctx.respond(f"Message `{message_id}` has **{star_count}** star(s).")
+
+    @discord.slash_command(description="Reconcile starred messages from channel history", guild_ids=[GUILD_ID])
+    @discord.default_permissions(administrator=True)
+    async def starboard_backfill(self, ctx, channel: discord.Option(discord.TextChannel, required=False), restart: discord.Option(bool, default=False)):
+        channels = [channel] if channel else self._backfill_channels(ctx.guild)
+        if not self.start_backfill(ctx.guild, channels, restart):
+            await ctx.respond("A starboard backfill is already running.")
+            return
+        await ctx.respond(f"Started a starboard backfill over {len(channels)} channel(s).")
+
+    @commands.slash_command(description="Get the starboard leaderboard!")
+    async def starboard(
+        self,
+        ctx,
+        window: discord.Option(str, choices=list(Leaderboard.WINDOWS), default="all-time"),
+        ranking: discord.Option(str, choices=["messages", "authors", "channels"], default="messages")
+    ):
         guild = self.bot.get_guild(GUILD_ID)
         starboard_channel = discord.utils.get(guild.text_channels, name="starboard")
         if not starboard_channel:
             await ctx.respond("Starboard channel does not exist.")
-        messages = await self._get_top_starboard_entries()
-        embed = discord.Embed(color=discord.Color.gold(), title="Starboard ranking")
-        i = 1
-        for message in messages:
-            embed.add_field(name=f"#{i}", value=f"https://discord.com/channels/{guild.id}/{starboard_channel.id}/{message.starboard_message_id} (**:star:{message.stars}**)", inline=False)
-            i += 1
-        await ctx.respond(embed=embed)
+            return
+
+        leaderboard = await self._get_leaderboard()
+        board = getattr(leaderboard.window(window), ranking)
+        rows = board.page(0, LEADERBOARD_PAGE_SIZE * LEADERBOARD_MAX_PAGES)
+        if not rows:
+            await ctx.respond("Nothing has been starred yet.")
+            return
+
+        embeds = []
+        for start in range(0, len(rows), LEADERBOARD_PAGE_SIZE):
+            embed = discord.Embed(color=discord.Color.gold(), title=f"Starboard ranking ({window}, {ranking})")
+            for rank, (key, stars) in enumerate(rows[start:start + LEADERBOARD_PAGE_SIZE], start=start + 1):
+                if ranking == "messages":
+                    starboard_message_id = leaderboard.info(key)[2]
+                    value = f"https://discord.com/channels/{guild.id}/{starboard_channel.id}/{starboard_message_id}"
+                elif ranking == "authors":
+                    value = f"<@{key}>"
+                else:
+                    value = f"<#{key}>"
+                embed.add_field(name=f"#{rank}", value=f"{value} (**:star:{stars}**)", inline=False)
+            embeds.append(embed)
+
+        paginator = pages.Paginator(pages=embeds)
+        await paginator.respond(ctx.interaction)
 
 def setup(bot):
     bot.add_cog(Starboard(bot))
\ No newline at end of file
@@ -1,61 +1,217 @@
 from discord.ext import commands
-from asgiref.sync import sync_to_async
-from db.models import StatusMonitor
-from datetime import datetime
+from db.access import db_call
+from django.db import transaction
+from db.models import MonitorRollup, StatusMonitor
+from db.write_behind import WriteBehind
+from utils.histogram import LatencyHistogram
+from utils import metrics, outbound
+from utils.instrumentation import track
+from utils.prober import ProberProcess, create_session, probe
+from utils.scheduler import Scheduler
+from utils.supervisor import SupervisedTask
+from utils.timeseries import Bucket, ProbeSeries
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import partial
 from django.utils import timezone
 from urllib.parse import urlparse
-import discord, asyncio, os, aiohttp, humanize
+import discord, asyncio, os, humanize, logging, time
 
 GUILD_ID = int(os.getenv("GUILD_ID"))
+# Only needs the guild and its channels to post alerts
+INTENTS = discord.Intents(guilds=True)
 STATUS_MONITOR_REFRESH = int(os.getenv("STATUS_MONITOR_REFRESH"))
+STATUS_MONITOR_TIMEOUT = float(os.getenv("STATUS_MONITOR_TIMEOUT", "10"))
+STATUS_MONITOR_CONCURRENCY = int(os.getenv("STATUS_MONITOR_CONCURRENCY", "20"))
+# Bytes of the body a match probe searches when the monitor sets no limit of its own
+STATUS_PROBE_MAX_BYTES = int(os.getenv("STATUS_PROBE_MAX_BYTES", "65536"))
+# "inline" probes on the bot's event loop, "process" in a separate worker process
+STATUS_PROBER_MODE = os.getenv("STATUS_PROBER_MODE", "inline")
+PROBE_JITTER = 0.1  # Fraction of a monitor's interval its probes are randomly shifted by
+PROBE_MODES = [
+    discord.OptionChoice("GET", "get"),
+    discord.OptionChoice("HEAD", "head"),
+    discord.OptionChoice("TCP connect", "tcp"),
+    discord.OptionChoice("GET and match text", "match")
+]
+STATE_WRITE_INTERVAL = 30  # Seconds between writes of monitor up/down transitions
+ROLLUP_INTERVAL = 60  # Seconds between writes of finished minute buckets
+MINUTE_ROLLUP_RETENTION = timedelta(days=int(os.getenv("STATUS_MINUTE_RETENTION_DAYS", "2")))
+HOUR_ROLLUP_RETENTION = timedelta(days=int(os.getenv("STATUS_HOUR_RETENTION_DAYS", "90")))
+PROBES = metrics.counter("status_probes_total", "Status monitor probes by result", ["monitor", "result"])
+PROBE_SECONDS = metrics.histogram("status_probe_seconds", "Response time of successful status monitor probes", ["monitor"])
+MONITOR_UP = metrics.gauge("status_monitor_up", "Whether the last probe of a status monitor succeeded", ["monitor"])
+STATS_WINDOWS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1), "month": timedelta(days=30)}
 
 class Status(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.logger = logging.getLogger(__name__)
+        # One pooled session for every probe so connections, DNS lookups and TLS sessions are reused
+        self.session = None
+        self._probe_semaphore = asyncio.Semaphore(STATUS_MONITOR_CONCURRENCY)
+        # Fires each monitor's probe when it is due, keyed by monitor ID
+        self.scheduler = Scheduler(self._probe_monitor, PROBE_JITTER)
+        # Set while the worker process runs in process mode, it then owns the schedule
+        self.prober = None
+        # Monitor ID -> StatusMonitor, read once and then kept current by the commands
+        self._monitors = None
+        self._monitors_lock = asyncio.Lock()
+        # Up/down transitions by monitor ID, written together every STATE_WRITE_INTERVAL
+        self.state_writes = WriteBehind("status monitors", StatusMonitor, STATE_WRITE_INTERVAL)
+        self.status_channel = None
+        # Started with the cog, survives reconnects and is cancelled with the cog
+        self.monitor_loop = SupervisedTask("Status monitor loop", self._run_monitors)
+        # Raw probe results per monitor ID, rolled up into minute buckets that are written once finished
+        self._series = {}
+        self._closed_buckets = []
+        self.rollup_writer = SupervisedTask("Status rollup writer", self._write_rollups)
+        # The minute writer and shutdown flushes would otherwise create the same rollup rows twice
+        self._rollup_lock = asyncio.Lock()
+        # On startup this runs once bot.run starts the loop, on /cogs load or reload right away
+        self._unloaded = False
+        bot.loop.call_soon(self._start_tasks)
+
+    def _start_tasks(self):
+        if self._unloaded:
+            return
+        self.monitor_loop.start()
+        self.rollup_writer.start()
+
+    def cog_unload(self):
+        self._unloaded = True
+        self.monitor_loop.cancel()
+        self.rollup_writer.cancel()
+        self.state_writes.stop()
+        self.scheduler.cancel_running()
+        if self.prober:
+            self.prober.stop()
+        if self.session:
+            asyncio.create_task(self.session.close())
+        if len(self.state_writes) or self._closed_buckets or self._series:
+            asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Write every state change and probe result recorded so far, including unfinished minutes"""
+        await self.state_writes.flush()
+        await self.flush_rollups(timezone.now() + timedelta(minutes=1))
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = create_session(STATUS_MONITOR_CONCURRENCY)
+        return self.session
     
-    @sync_to_async
-    def _get_monitor(self, name: str):
-        try:
-            return StatusMonitor.objects.get(name=name)
-        except StatusMonitor.DoesNotExist:
-            return None
+    async def _get_monitors(self):
+        async with self._monitors_lock:
+            if self._monitors is None:
+                self._monitors = {monitor.id: monitor for monitor in await self._get_all_monitors()}
+        return self._monitors
+
+    async def _get_monitor(self, name: str):
+        monitors = await self._get_monitors()
+        return next((monitor for monitor in monitors.values() if monitor.name == name), None)
         
-    @sync_to_async
-    def _update_monitor(self, monitor: StatusMonitor, new_name: str, url: str):
+    @db_call
+    def _update_monitor(self, monitor: StatusMonitor, new_name: str, url: str, interval: int, timeout: float, probe_mode: str, expect: str, max_bytes: int):
         if new_name:
             monitor.name = new_name
         if url:
             monitor.url = url
-        monitor.save()
+        if interval:
+            monitor.interval = interval
+        if timeout:
+            monitor.timeout = timeout
+        if probe_mode:
+            monitor.probe_mode = probe_mode
+        if expect:
+            monitor.expect = expect
+        if max_bytes is not None:
+            monitor.max_bytes = max_bytes
+        # is_down and downtime_start go through the state write buffer
+        monitor.save(update_fields=["name", "url", "interval", "timeout", "probe_mode", "expect", "max_bytes"])
 
-    @sync_to_async
-    def _monitor_go_down(self, monitor: StatusMonitor):
+    async def _monitor_go_down(self, monitor: StatusMonitor):
         monitor.is_down = True
         monitor.downtime_start = timezone.now()
-        monitor.save()
+        await self.state_writes.put(monitor.id, is_down=True, downtime_start=monitor.downtime_start)
     
-    @sync_to_async
-    def _monitor_up(self, monitor: StatusMonitor):
+    async def _monitor_up(self, monitor: StatusMonitor):
         monitor.is_down = False
-        monitor.save()
+        await self.state_writes.put(monitor.id, is_down=False)
     
-    @sync_to_async
-    def _create_monitor(self, name: str, url: str):
-        return StatusMonitor.objects.create(name=name, url=url, is_down=False, downtime_start=timezone.now())
+    @db_call
+    def _create_monitor(self, name: str, url: str, interval: int, timeout: float, probe_mode: str, expect: str, max_bytes: int):
+        return StatusMonitor.objects.create(
+            name=name, url=url, is_down=False, downtime_start=timezone.now(), interval=interval, timeout=timeout,
+            probe_mode=probe_mode or "get", expect=expect, max_bytes=max_bytes
+        )
     
-    @sync_to_async
+    @db_call
     def _delete_monitor(self, monitor: StatusMonitor):
         monitor.delete()
 
-    @sync_to_async
-    def _get_all_monitors(name: str):
+    @db_call
+    def _get_all_monitors(self):
         return list(StatusMonitor.objects.all())
 
+    @staticmethod
+    def _rollup_bucket(row):
+        bucket = Bucket(row.bucket_start)
+        bucket.probes = row.probes
+        bucket.failures = row.failures
+        bucket.latency = LatencyHistogram.from_dict(row.latency)
+        return bucket
+
+    @db_call
+    def _get_rollups(self, monitor_id: int, resolution: str, since: datetime):
+        rows = MonitorRollup.objects.filter(monitor_id=monitor_id, resolution=resolution, bucket_start__gte=since)
+        return [self._rollup_bucket(row) for row in rows]
+
+    @db_call
+    def _save_rollups(self, buckets):
+        """Merge finished minute buckets into their minute and hour rollups and drop expired rollups"""
+        merged = {}
+        for monitor_id, bucket in buckets:
+            for resolution, start in ((MonitorRollup.MINUTE, bucket.start), (MonitorRollup.HOUR, bucket.start.replace(minute=0))):
+                merged.setdefault((monitor_id, resolution, start), Bucket(start)).merge(bucket)
+        now = timezone.now()
+        with transaction.atomic():
+            existing = MonitorRollup.objects.filter(
+                monitor_id__in={key[0] for key in merged},
+                bucket_start__in={key[2] for key in merged}
+            )
+            rows = {(row.monitor_id, row.resolution, row.bucket_start): row for row in existing}
+            created, updated = [], []
+            for (monitor_id, resolution, start), bucket in merged.items():
+                row = rows.get((monitor_id, resolution, start))
+                if row:
+                    bucket.merge(self._rollup_bucket(row))
+                    row.probes, row.failures, row.latency = bucket.probes, bucket.failures, bucket.latency.to_dict()
+                    updated.append(row)
+                else:
+                    created.append(MonitorRollup(
+                        monitor_id=monitor_id, resolution=resolution, bucket_start=start,
+                        probes=bucket.probes, failures=bucket.failures, latency=bucket.latency.to_dict()
+                    ))
+            MonitorRollup.objects.bulk_create(created)
+            MonitorRollup.objects.bulk_update(updated, ["probes", "failures", "latency"])
+            MonitorRollup.objects.filter(resolution=MonitorRollup.MINUTE, bucket_start__lt=now - MINUTE_ROLLUP_RETENTION).delete()
+            MonitorRollup.objects.filter(resolution=MonitorRollup.HOUR, bucket_start__lt=now - HOUR_ROLLUP_RETENTION).delete()
+
     status_monitor = discord.SlashCommandGroup("status_monitor", "Status Monitor commands", guild_ids=[GUILD_ID])
 
     @status_monitor.command(name="add", description="Add a status monitor")
     @discord.default_permissions(administrator=True)
-    async def add_status_monitor(self, ctx, name: discord.Option(str), url: discord.Option(str)):
+    async def add_status_monitor(
+        self,
+        ctx,
+        name: discord.Option(str),
+        url: discord.Option(str),
+        interval: discord.Option(int, "Seconds between checks", required=False, min_value=10),
+        timeout: discord.Option(float, "Seconds before a check fails", required=False, min_value=1),
+        probe_mode: discord.Option(str, "How to check the URL", choices=PROBE_MODES, required=False),
+        expect: discord.Option(str, "Text the response must contain", required=False),
+        max_bytes: discord.Option(int, "Most bytes of the response body to read", required=False, min_value=0)
+    ):
         parsed = urlparse(url)
         if not parsed.netloc or not parsed.scheme:
             await ctx.respond("You have not set a valid URL.")
@@ -63,13 +219,34 @@ class Status(commands.Cog):
         if await self._get_monitor(name):
             await ctx.respond(f"A status monitor with the name `{name}` already exists.")
             return
-        await self._create_monitor(name, url)
+        if expect and not probe_mode:
+            probe_mode = "match"
+        if probe_mode == "match" and not expect:
+            await ctx.respond("Set the text the response must contain to match it.")
+            return
+        if probe_mode == "match" and max_bytes == 0:
+            await ctx.respond("Matching text needs at least one byte of the response, leave max_bytes unset for the default.")
+            return
+        monitor = await self._create_monitor(name, url, interval, timeout, probe_mode, expect, max_bytes)
+        (await self._get_monitors())[monitor.id] = monitor
+        self._schedule(monitor)
         await ctx.respond(f"Succesfully created monitor `{name}`.")
     
     @status_monitor.command(name="edit", description="Edit a status monitor")
     @discord.default_permissions(administrator=True)
-    async def edit_status_monitor(self, ctx, monitor_name: discord.Option(str), new_name: discord.Option(str, required=False), url: discord.Option(str, required=False)):
-        if not new_name and not url:
+    async def edit_status_monitor(
+        self,
+        ctx,
+        monitor_name: discord.Option(str),
+        new_name: discord.Option(str, required=False),
+        url: discord.Option(str, required=False),
+        interval: discord.Option(int, "Seconds between checks", required=False, min_value=10),
+        timeout: discord.Option(float, "Seconds before a check fails", required=False, min_value=1),
+        probe_mode: discord.Option(str, "How to check the URL", choices=PROBE_MODES, required=False),
+        expect: discord.Option(str, "Text the response must contain", required=False),
+        max_bytes: discord.Option(int, "Most bytes of the response body to read", required=False, min_value=0)
+    ):
+        if not new_name and not url and not interval and not timeout and not probe_mode and not expect and max_bytes is None:
             await ctx.respond("Nothing to change.")
             return
         monitor = await self._get_monitor(monitor_name)
@@ -81,7 +258,16 @@ class Status(commands.Cog):
             if not parsed.netloc or not parsed.scheme:
                 await ctx.respond("You have not set a valid URL.")
                 return
-        await self._update_monitor(monitor, new_name, url)
+        if expect and not probe_mode:
+            probe_mode = "match"
+        if (probe_mode or monitor.probe_mode) == "match" and not (expect or monitor.expect):
+            await ctx.respond("Set the text the response must contain to match it.")
+            return
+        if (probe_mode or monitor.probe_mode) == "match" and (monitor.max_bytes if max_bytes is None else max_bytes) == 0:
+            await ctx.respond("Matching text needs at least one byte of the response, leave max_bytes unset for the default.")
+            return
+        await self._update_monitor(monitor, new_name, url, interval, timeout, probe_mode, expect, max_bytes)
+        self._schedule(monitor)
         await ctx.respond(f"Updated monitor `{monitor_name}`.")
     
     @status_monitor.command(name="delete", description="Delete a status monitor")
@@ -91,46 +277,225 @@ class Status(commands.Cog):
         if not monitor:
             await ctx.respond(f"No monitor exists with the name `{monitor_name}`.")
             return
+        monitor_id = monitor.id
         await self._delete_monitor(monitor)
+        self._monitors.pop(monitor_id, None)
+        self._unschedule(monitor_id)
+        self._series.pop(monitor_id, None)
+        self.state_writes.discard(monitor_id)
         await ctx.respond(f"Successfully deleted monitor `{monitor_name}`.")
     
     @status_monitor.command(name="list", description="List all status monitors")
     @discord.default_permissions(administrator=True)
     async def list_status_monitor(self, ctx):
-        monitors = await self._get_all_monitors()
+        monitors = await self._get_monitors()
         embed = discord.Embed(title="List of monitors")
-        for monitor in monitors:
-            embed.add_field(name=monitor.name, value=monitor.url, inline=False)
+        for monitor in monitors.values():
+            interval = monitor.interval or STATUS_MONITOR_REFRESH
+            timeout = monitor.timeout or STATUS_MONITOR_TIMEOUT
+            embed.add_field(name=monitor.name, value=f"{monitor.url}\n{monitor.get_probe_mode_display()} every {interval}s, timeout {timeout:g}s", inline=False)
         await ctx.respond(embed=embed)
     
-    @commands.Cog.listener()
-    async def on_ready(self):
+    @status_monitor.command(name="health", description="Show the state of the status monitor loop")
+    @discord.default_permissions(administrator=True)
+    async def status_monitor_health(self, ctx):
+        loop = self.monitor_loop
+        embed = discord.Embed(title="Status monitor loop", color=discord.Color.green() if loop.running else discord.Color.red())
+        embed.add_field(name="Running", value="Yes" if loop.running else "No")
+        scheduled = len(self._monitors or {}) if self.prober else len(self.scheduler)
+        embed.add_field(name="Monitors scheduled", value=str(scheduled))
+        embed.add_field(name="Prober", value="Worker process" if STATUS_PROBER_MODE == "process" else "Inline")
+        embed.add_field(name="Restarts", value=str(loop.restarts))
+        if loop.started_at:
+            embed.add_field(name="Started", value=f"<t:{int(loop.started_at)}:R>")
+        if loop.last_run_at:
+            embed.add_field(name="Last probe", value=f"<t:{int(loop.last_run_at)}:R>")
+            embed.add_field(name="Last probe duration", value=f"{loop.last_run_duration * 1000:.0f} ms")
+        if loop.last_error:
+            embed.add_field(name="Last error", value=loop.last_error[:1024], inline=False)
+        await ctx.respond(embed=embed)
+
+    @status_monitor.command(name="stats", description="Show uptime and latency of a status monitor")
+    @discord.default_permissions(administrator=True)
+    async def status_monitor_stats(
+        self,
+        ctx,
+        monitor_name: discord.Option(str),
+        window: discord.Option(str, "Time span to summarize", choices=list(STATS_WINDOWS), default="day")
+    ):
+        monitor = await self._get_monitor(monitor_name)
+        if not monitor:
+            await ctx.respond(f"No monitor exists with the name `{monitor_name}`.")
+            return
+        # Minute rollups for the last hour, hour rollups for anything longer
+        since = timezone.now() - STATS_WINDOWS[window]
+        if window == "hour":
+            resolution, since = MonitorRollup.MINUTE, since.replace(second=0, microsecond=0)
+        else:
+            resolution, since = MonitorRollup.HOUR, since.replace(minute=0, second=0, microsecond=0)
+        total = Bucket(since)
+        for bucket in await self._get_rollups(monitor.id, resolution, since):
+            total.merge(bucket)
+        # Minutes that haven't been written yet
+        for monitor_id, bucket in self._closed_buckets:
+            if monitor_id == monitor.id:
+                total.merge(bucket)
+        series = self._series.get(monitor.id)
+        if series and series.open_bucket:
+            total.merge(series.open_bucket)
+        if not total.probes:
+            await ctx.respond(f"No checks of `{monitor_name}` were recorded in the last {window}.")
+            return
+
+        def latency(q):
+            value = total.latency.percentile(q)
+            return "-" if value is None else f"{value * 1000:.0f} ms"
+
+        embed = discord.Embed(title=f"{monitor.name} over the last {window}")
+        embed.add_field(name="Uptime", value=f"{total.uptime * 100:.2f}%")
+        embed.add_field(name="Checks", value=str(total.probes))
+        embed.add_field(name="Failures", value=str(total.failures))
+        embed.add_field(name="p50", value=latency(50))
+        embed.add_field(name="p95", value=latency(95))
+        embed.add_field(name="p99", value=latency(99))
+        if series and series.raw:
+            timestamp, ok, _, status = series.raw[-1]
+            result = status if status is not None else "no response"
+            embed.add_field(name="Last check", value=f"{'Up' if ok else 'Down'} ({result}) <t:{int(timestamp.timestamp())}:R>", inline=False)
+        await ctx.respond(embed=embed)
+
+    async def _run_monitors(self):
+        await self.bot.wait_until_ready()
         guild = self.bot.get_guild(GUILD_ID)
         status_channel = discord.utils.get(guild.text_channels, name="rose-server-status")
         if not status_channel:
             return
+        self.status_channel = status_channel
+        monitors = await self._get_monitors()
+        if STATUS_PROBER_MODE == "process":
+            await self._run_prober_process(monitors)
+            return
+        for monitor in monitors.values():
+            self._schedule(monitor)
+        await self.scheduler.run()
+
+    async def _run_prober_process(self, monitors):
+        """Probe from a worker process and only handle the results here"""
+        self.prober = ProberProcess(STATUS_MONITOR_CONCURRENCY, PROBE_JITTER)
+        self.prober.start()
+        try:
+            for monitor in monitors.values():
+                self._schedule(monitor)
+            async for monitor_id, timestamp, duration, latency, status, error in self.prober.results():
+                monitor = self._monitors.get(monitor_id)
+                if not monitor:
+                    continue
+                try:
+                    with track("task", "Status", "handle_result"):
+                        await self._handle_result(monitor, self.status_channel, datetime.fromtimestamp(timestamp, dt_timezone.utc), latency, status, error)
+                except Exception as e:
+                    self.logger.error(f"Error checking monitor {monitor.name}: {e}")
+                self.monitor_loop.record_run(duration)
+        finally:
+            self.prober.stop()
+            self.prober = None
+
+    def _schedule(self, monitor):
+        """Schedule a monitor that is new or got a new interval"""
+        interval = monitor.interval or STATUS_MONITOR_REFRESH
+        if STATUS_PROBER_MODE == "process":
+            # Monitors are all sent once the worker starts
+            if self.prober:
+                self.prober.schedule(monitor.id, interval, self._probe_settings(monitor))
+        elif self.scheduler.interval(monitor.id) != interval:
+            self.scheduler.schedule(monitor.id, interval)
+
+    def _probe_settings(self, monitor):
+        """Keyword arguments for probe() from a monitor's fields and the global defaults"""
+        max_bytes = monitor.max_bytes
+        if max_bytes is None:
+            max_bytes = STATUS_PROBE_MAX_BYTES if monitor.probe_mode == "match" else 0
+        return {
+            "url": monitor.url,
+            "timeout": monitor.timeout or STATUS_MONITOR_TIMEOUT,
+            "mode": monitor.probe_mode,
+            "expect": monitor.expect,
+            "max_bytes": max_bytes
+        }
+
+    def _unschedule(self, monitor_id):
+        if self.prober:
+            self.prober.unschedule(monitor_id)
+        self.scheduler.unschedule(monitor_id)
+
+    async def _probe_monitor(self, monitor_id):
+        monitor = self._monitors.get(monitor_id)
+        if not monitor or not self.status_channel:
+            return
+        start = time.perf_counter()
+        try:
+            with track("task", "Status", "check_monitor"):
+                await self._check_monitor(monitor, self.status_channel)
+        except Exception as e:
+            self.logger.error(f"Error checking monitor {monitor.name}: {e}")
+        self.monitor_loop.record_run(time.perf_counter() - start)
+
+    async def _check_monitor(self, monitor, status_channel):
+        async with self._probe_semaphore:
+            latency, status, error = await probe(self._get_session(), **self._probe_settings(monitor))
+        await self._handle_result(monitor, status_channel, timezone.now(), latency, status, error)
+
+    async def _handle_result(self, monitor, status_channel, timestamp, latency, status, error):
+        self._record_probe(monitor.id, timestamp, error is None, latency, status)
+        PROBES.inc(monitor=monitor.name, result="down" if error else "up")
+        MONITOR_UP.set(0 if error else 1, monitor=monitor.name)
+        if latency is not None and not error:
+            PROBE_SECONDS.observe(latency, monitor=monitor.name)
+        if error:
+            await self._report_down(monitor, status_channel, error)
+        elif monitor.is_down:
+            embed = discord.Embed(color=discord.Color.green(), title=f"{monitor.name} is up!", description=f"Downtime duration: {humanize.time.naturaldelta(timezone.now() - monitor.downtime_start)}")
+            await self.bot.outbound.submit(outbound.ALERT, partial(status_channel.send, embed=embed))
+            await self._monitor_up(monitor)
+
+    def _record_probe(self, monitor_id, timestamp, ok, latency, status):
+        series = self._series.setdefault(monitor_id, ProbeSeries())
+        closed = series.append(timestamp, ok, latency, status)
+        if closed:
+            self._closed_buckets.append((monitor_id, closed))
+
+    async def _write_rollups(self):
+        await self.bot.wait_until_ready()
         while True:
-            await asyncio.sleep(STATUS_MONITOR_REFRESH)
-            monitors = await self._get_all_monitors()
-            for monitor in monitors:
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        async with session.get(monitor.url) as response:
-                            if str(response.status).startswith("5") or str(response.status).startswith("4"):
-                                if not monitor.is_down:
-                                    embed = discord.Embed(color=discord.Color.red(), title=f"{monitor.name} is down!", description=f"Request failed with status code: {response.status}")
-                                    await status_channel.send(embed=embed)
-                                    await self._monitor_go_down(monitor)
-                            else:
-                                if monitor.is_down:
-                                    embed = discord.Embed(color=discord.Color.green(), title=f"{monitor.name} is up!", description=f"Downtime duration: {humanize.time.naturaldelta(timezone.now() - monitor.downtime_start)}")
-                                    await status_channel.send(embed=embed)
-                                    await self._monitor_up(monitor)
-                    except Exception as e:
-                        if not monitor.is_down:
-                            embed = discord.Embed(color=discord.Color.red(), title=f"{monitor.name} is down!", description=f"Request failed with exception: {e}")
-                            await status_channel.send(embed=embed)
-                            await self._monitor_go_down(monitor)
+            await asyncio.sleep(ROLLUP_INTERVAL)
+            await self.flush_rollups(timezone.now())
+
+    async def flush_rollups(self, before):
+        """Write all minute buckets that started before the minute of before"""
+        async with self._rollup_lock:
+            minute = before.replace(second=0, microsecond=0)
+            for monitor_id, series in self._series.items():
+                closed = series.close_before(minute)
+                if closed:
+                    self._closed_buckets.append((monitor_id, closed))
+            # Monitors deleted since their probe have no row to attach rollups to
+            registry = self._monitors or {}
+            pending = [(monitor_id, bucket) for monitor_id, bucket in self._closed_buckets if monitor_id in registry]
+            self._closed_buckets = []
+            if not pending:
+                return
+            try:
+                await self._save_rollups(pending)
+            except Exception:
+                self._closed_buckets = pending + self._closed_buckets
+                raise
+
+    async def _report_down(self, monitor, status_channel, description):
+        if monitor.is_down:
+            return
+        embed = discord.Embed(color=discord.Color.red(), title=f"{monitor.name} is down!", description=description)
+        await self.bot.outbound.submit(outbound.ALERT, partial(status_channel.send, embed=embed))
+        await self._monitor_go_down(monitor)
 
 def setup(bot):
     bot.add_cog(Status(bot))
\ No newline at end of file
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0003_bannedphrase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stargazer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(max_length=19)),
+                ('user_id', models.CharField(max_length=19)),
+                ('on_starboard', models.BooleanField()),
+            ],
+            options={
+                'unique_together': {('message_id', 'user_id', 'on_starboard')},
+            },
+        ),
+    ]
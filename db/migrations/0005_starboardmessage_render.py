@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0004_stargazer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='starboardmessage',
+            name='render',
+            field=models.JSONField(null=True),
+        ),
+        migrations.AddField(
+            model_name='starboardmessage',
+            name='source_edited_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:14
+
+from django.db import migrations, models
+import logging
+
+
+def remove_duplicate_entries(apps, schema_editor):
+    # Concurrent reactions could post a message twice, keep the newest entry like
+    # the bot does at runtime and log the posts the dropped ones pointed at
+    StarboardMessage = apps.get_model('db', 'StarboardMessage')
+    logger = logging.getLogger(__name__)
+    seen = set()
+    for entry in StarboardMessage.objects.order_by('-id'):
+        if entry.message_id in seen:
+            logger.warning(
+                f"Removed duplicate starboard entry for {entry.message_id}, "
+                f"its starboard post {entry.starboard_message_id} is orphaned"
+            )
+            entry.delete()
+        else:
+            seen.add(entry.message_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0005_starboardmessage_render'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='starboardmessage',
+            name='message_id',
+            field=models.CharField(max_length=19, unique=True),
+        ),
+    ]
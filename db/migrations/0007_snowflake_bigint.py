@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:15
+
+from django.db import migrations, models
+
+
+SNOWFLAKE_FIELDS = {
+    'StarboardMessage': ('message_id', 'starboard_message_id', 'channel_id'),
+    'Stargazer': ('message_id', 'user_id'),
+    'BannedPhrase': ('added_by',),
+}
+
+
+def remove_invalid_snowflakes(apps, schema_editor):
+    # Rows whose IDs aren't plain digits can't be cast to integers in place
+    for model_name, fields in SNOWFLAKE_FIELDS.items():
+        model = apps.get_model('db', model_name)
+        for row in model.objects.values('id', *fields):
+            if not all(str(row[field]).strip().isdigit() for field in fields):
+                model.objects.filter(id=row['id']).delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0006_starboardmessage_unique_message_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_invalid_snowflakes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='bannedphrase',
+            name='added_by',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='starboardmessage',
+            name='channel_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='starboardmessage',
+            name='message_id',
+            field=models.BigIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='starboardmessage',
+            name='starboard_message_id',
+            field=models.BigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='starboardmessage',
+            name='stars',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='stargazer',
+            name='message_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='stargazer',
+            name='user_id',
+            field=models.BigIntegerField(),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0007_snowflake_bigint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='starboardmessage',
+            name='author_id',
+            field=models.BigIntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0008_starboardmessage_author_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StarboardCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.BigIntegerField(unique=True)),
+                ('last_message_id', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0009_starboardcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statusmonitor',
+            name='interval',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='statusmonitor',
+            name='timeout',
+            field=models.FloatField(null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0010_statusmonitor_interval_timeout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonitorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('m', 'Minute'), ('h', 'Hour')], max_length=1)),
+                ('bucket_start', models.DateTimeField()),
+                ('probes', models.IntegerField()),
+                ('failures', models.IntegerField()),
+                ('latency', models.JSONField()),
+                ('monitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='db.statusmonitor')),
+            ],
+            options={
+                'unique_together': {('monitor', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0011_monitorrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statusmonitor',
+            name='expect',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='statusmonitor',
+            name='max_bytes',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='statusmonitor',
+            name='probe_mode',
+            field=models.CharField(choices=[('get', 'GET'), ('head', 'HEAD'), ('tcp', 'TCP connect'), ('match', 'GET and match text')], default='get', max_length=8),
+        ),
+    ]
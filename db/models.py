@@ -2,17 +2,58 @@ from django.db import models
 
 # Create your models here.
 class StarboardMessage(models.Model):
-    message_id = models.CharField(max_length=19)
-    starboard_message_id = models.CharField(max_length=19)
-    channel_id = models.CharField(max_length=19)
-    stars = models.IntegerField()
+    message_id = models.BigIntegerField(unique=True)
+    starboard_message_id = models.BigIntegerField(db_index=True)
+    channel_id = models.BigIntegerField()
+    # Unknown for entries posted before authors were stored
+    author_id = models.BigIntegerField(null=True)
+    stars = models.IntegerField(db_index=True)
+    # Embed payload posted to the starboard, rebuilt only when the original message is edited
+    render = models.JSONField(null=True)
+    source_edited_at = models.DateTimeField(null=True)
 
 class StatusMonitor(models.Model):
     name = models.CharField(max_length=128)
     url = models.CharField(max_length=2048)
     is_down = models.BooleanField()
     downtime_start = models.DateTimeField()
+    # Seconds between probes and before a probe fails, the global defaults when unset
+    interval = models.IntegerField(null=True)
+    timeout = models.FloatField(null=True)
+    # get and match read at most max_bytes of the body, match fails unless expect is among them
+    probe_mode = models.CharField(max_length=8, default="get", choices=[("get", "GET"), ("head", "HEAD"), ("tcp", "TCP connect"), ("match", "GET and match text")])
+    expect = models.CharField(max_length=255, null=True)
+    max_bytes = models.IntegerField(null=True)
 
 class BannedPhrase(models.Model):
     phrase = models.CharField(max_length=255, unique=True)
-    added_by = models.CharField(max_length=19)
+    added_by = models.BigIntegerField()
+
+class Stargazer(models.Model):
+    message_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    # A user can star both the original message and its starboard post, each counts once
+    on_starboard = models.BooleanField()
+
+    class Meta:
+        unique_together = ("message_id", "user_id", "on_starboard")
+
+class StarboardCheckpoint(models.Model):
+    # Newest message of the channel the starboard backfill has already reconciled
+    channel_id = models.BigIntegerField(unique=True)
+    last_message_id = models.BigIntegerField()
+
+class MonitorRollup(models.Model):
+    MINUTE = "m"
+    HOUR = "h"
+
+    monitor = models.ForeignKey(StatusMonitor, on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=1, choices=[(MINUTE, "Minute"), (HOUR, "Hour")])
+    bucket_start = models.DateTimeField()
+    probes = models.IntegerField()
+    failures = models.IntegerField()
+    # Sparse latency histogram of the bucket, see utils.histogram.LatencyHistogram
+    latency = models.JSONField()
+
+    class Meta:
+        unique_together = ("monitor", "resolution", "bucket_start")
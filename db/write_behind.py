@@ -0,0 +1,103 @@
+from django.db import transaction
+from db.access import db_call
+from utils import metrics
+from utils.supervisor import SupervisedTask
+import asyncio
+
+PENDING = metrics.gauge("write_behind_pending", "Rows with changes waiting to be written", ["buffer"])
+WRITTEN = metrics.counter("write_behind_rows_written_total", "Rows written by write-behind flushes", ["buffer"])
+COALESCED = metrics.counter("write_behind_coalesced_total", "Changes merged into a change already waiting for the same row", ["buffer"])
+BACKPRESSURE = metrics.counter("write_behind_backpressure_total", "Changes that had to wait for a flush because the buffer was full", ["buffer"])
+
+class WriteBehind:
+    """Collects field changes per primary key and writes them with bulk_update every interval seconds.
+
+    Later changes to a row overwrite earlier ones, so a row that changes a hundred
+    times between flushes is written once. At most max_pending rows wait at a time,
+    put() on a new row blocks until a flush has made room. Owners call flush() on
+    shutdown and unload so nothing buffered is lost. After stop() changes are only
+    buffered, whatever the final flush() writes them.
+    """
+
+    def __init__(self, name, model, interval=5, max_pending=1000):
+        self.name = name
+        self.model = model
+        self.interval = interval
+        self.max_pending = max_pending
+        # Primary key -> {field: value}
+        self._pending = {}
+        self._flush_now = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._stopped = False
+        self._task = SupervisedTask(f"{name} write-behind", self._run)
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def put(self, pk, **values):
+        """Queue new field values for a row, waiting for room if the buffer is full"""
+        if not self._stopped:
+            self._task.start()
+        # Once stopped nothing flushes in the background, so waiting for room would never end
+        if not self._stopped and pk not in self._pending and len(self._pending) >= self.max_pending:
+            BACKPRESSURE.inc(buffer=self.name)
+            async with self._flushed:
+                while pk not in self._pending and len(self._pending) >= self.max_pending:
+                    self._flush_now.set()
+                    await self._flushed.wait()
+        if pk in self._pending:
+            COALESCED.inc(buffer=self.name)
+        self._pending.setdefault(pk, {}).update(values)
+        PENDING.set(len(self._pending), buffer=self.name)
+
+    def pending(self, pk):
+        """Field values queued for a row but not written yet"""
+        return self._pending.get(pk)
+
+    def discard(self, pk):
+        """Forget queued changes for a row, e.g. because it was deleted"""
+        self._pending.pop(pk, None)
+        PENDING.set(len(self._pending), buffer=self.name)
+
+    def stop(self):
+        self._stopped = True
+        self._task.cancel()
+
+    async def flush(self):
+        """Write everything queued so far in one transaction"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            PENDING.set(0, buffer=self.name)
+            try:
+                if pending:
+                    await self._write(pending)
+                    WRITTEN.inc(len(pending), buffer=self.name)
+            except Exception:
+                # Put the rows back without overwriting anything newer queued meanwhile
+                for pk, values in pending.items():
+                    self._pending[pk] = {**values, **self._pending.get(pk, {})}
+                PENDING.set(len(self._pending), buffer=self.name)
+                raise
+            finally:
+                async with self._flushed:
+                    self._flushed.notify_all()
+
+    @db_call
+    def _write(self, pending):
+        # bulk_update takes one field list, so rows are grouped by the fields they changed
+        groups = {}
+        for pk, values in pending.items():
+            groups.setdefault(tuple(sorted(values)), []).append(self.model(pk=pk, **values))
+        with transaction.atomic():
+            for fields, rows in groups.items():
+                self.model.objects.bulk_update(rows, list(fields))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
@@ -1,68 +1,206 @@
 import os
+import asyncio
+import importlib
+import logging
 import discord
-from discord.ext import commands
 from dotenv import load_dotenv
 import manage
+from utils.pipeline import MessagePipeline
+from utils.message_cache import MessageCache
+from utils.outbound import OutboundQueue
+from utils import gateway, metrics
+from utils.loop_monitor import LoopMonitor
+from utils.metrics_server import MetricsServer
+from utils.instrumentation import HANDLER_ERRORS, HANDLER_SECONDS, HANDLERS_IN_FLIGHT, InstrumentedBot
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = int(os.getenv("GUILD_ID"))
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", "1024"))
+MESSAGE_CACHE_TTL = int(os.getenv("MESSAGE_CACHE_TTL", "300"))
+# Prometheus endpoint, off unless a port is set
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+USE_UVLOOP = os.getenv("USE_UVLOOP", "false").lower() in ("1", "true", "yes")
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.5"))
+OUTBOUND_CONCURRENCY = int(os.getenv("OUTBOUND_CONCURRENCY", "8"))
+logger = logging.getLogger(__name__)
+COG_NAMES = sorted(filename[:-3] for filename in os.listdir('./cogs') if filename.endswith('.py'))
 
-game_activity = discord.Game(name=os.getenv("STATUS"))
-intents = discord.Intents.default()
-intents.members = True # Example for member access
-intents.message_content = True
-intents.presences = True
-bot = commands.Bot(
-    activity=game_activity, 
-    status=discord.Status.online,
-    intents=intents
-)
-
-@bot.event
-async def on_ready():
-    print(f'We have logged in as {bot.user}')
-
-cogs = bot.create_group("cogs", "Manage cogs", guild_ids=[GUILD_ID])
-
-@cogs.command(description="Load a cog")
-@discord.default_permissions(administrator=True)
-async def load(ctx, cog_name: discord.Option(str)):
-    try:
-        bot.load_extension(f"cogs.{cog_name}")
-        await ctx.respond(f"Successfully loaded cog `{cog_name}`.")
-    except:
-        await ctx.respond(f"Unable to load cog `{cog_name}`.")
-
-@cogs.command(description="Unload a cog")
-@discord.default_permissions(administrator=True)
-async def unload(ctx, cog_name: discord.Option(str)):
-    try:
-        bot.unload_extension(f"cogs.{cog_name}")
-        await ctx.respond(f"Successfully unloaded cog `{cog_name}`.")
-    except:
-        await ctx.respond(f"Unable to unload cog `{cog_name}`.")
-
-@cogs.command(description="Reload a cog")
-@discord.default_permissions(administrator=True)
-async def reload(ctx, cog_name: discord.Option(str)):
-    try:
-        bot.unload_extension(f"cogs.{cog_name}")
-        bot.load_extension(f"cogs.{cog_name}")
-        await ctx.respond(f"Successfully reloaded cog `{cog_name}`.")
-    except:
-        await ctx.respond(f"Unable to reload cog `{cog_name}`.")
-
-@bot.slash_command(description="Shutdown the bot", guild_ids=[GUILD_ID])
-@discord.default_permissions(administrator=True)
-async def shutdown(ctx):
-    await ctx.respond("Shutting down!")
-    await bot.close()
-
-for filename in os.listdir('./cogs'):
-    if filename.endswith('.py'):
-        cog = filename[:-3]
+GATEWAY_EVENTS = metrics.counter("gateway_events_total", "Events received from the gateway", ["event"])
+GATEWAY_LATENCY = metrics.gauge("gateway_latency_seconds", "Time between the last gateway heartbeat and its acknowledgement")
+MESSAGE_CACHE_SIZE_GAUGE = metrics.gauge("message_cache_size", "Messages held by the shared message cache")
+MESSAGE_CACHE_HIT_RATIO = metrics.gauge("message_cache_hit_ratio", "Share of message cache lookups served without a new fetch")
+
+def main():
+    """Build the bot, load every cog and connect.
+
+    Kept out of module level because the status prober's spawned worker
+    imports this script again as __mp_main__ before it runs, and must not
+    start a second bot.
+    """
+    # The bot grabs its event loop when it is constructed, so the policy has to be chosen first
+    if USE_UVLOOP:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    # Cog modules are imported before the bot exists so their declared intents and caches decide how it connects
+    intents, member_cache_flags, max_messages = gateway.cog_requirements(
+        importlib.import_module(f'cogs.{cog}') for cog in COG_NAMES
+    )
+    print(f'Gateway intents: {", ".join(name for name, enabled in intents if enabled)}')
+    print(f'No longer receiving: {", ".join(gateway.dropped_intents(intents)) or "nothing"}')
+
+    game_activity = discord.Game(name=os.getenv("STATUS"))
+    # Times every listener and application command, see /debug handlers
+    bot = InstrumentedBot(
+        activity=game_activity, 
+        status=discord.Status.online,
+        intents=intents,
+        member_cache_flags=member_cache_flags,
+        max_messages=max_messages
+    )
+
+    @bot.listen("on_socket_event_type")
+    async def count_gateway_event(event):
+        GATEWAY_EVENTS.inc(event=event)
+
+    # Cogs register ordered stages here instead of their own on_message listeners
+    bot.message_pipeline = MessagePipeline(bot)
+    bot.add_listener(bot.message_pipeline.dispatch, "on_message")
+
+    # Shared by cogs so the same message isn't fetched over REST again and again
+    bot.message_cache = MessageCache(MESSAGE_CACHE_SIZE, MESSAGE_CACHE_TTL)
+
+    # Shared by cogs so moderation actions are sent before alerts and alerts before cosmetic edits
+    bot.outbound = OutboundQueue(OUTBOUND_CONCURRENCY)
+
+    @bot.listen("on_raw_message_edit")
+    async def invalidate_edited_message(payload):
+        bot.message_cache.invalidate(payload.message_id)
+
+    @bot.listen("on_raw_message_delete")
+    async def invalidate_deleted_message(payload):
+        bot.message_cache.invalidate(payload.message_id)
+
+    @bot.listen("on_raw_bulk_message_delete")
+    async def invalidate_deleted_messages(payload):
+        for message_id in payload.message_ids:
+            bot.message_cache.invalidate(message_id)
+
+    def collect_bot_metrics():
+        GATEWAY_LATENCY.set(bot.latency)
+        stats = bot.message_cache.stats()
+        MESSAGE_CACHE_SIZE_GAUGE.set(stats["size"])
+        MESSAGE_CACHE_HIT_RATIO.set(stats["hit_rate"])
+
+    metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT, [collect_bot_metrics]) if METRICS_PORT else None
+
+    # Lag is labelled with the loop implementation so asyncio and uvloop runs can be compared
+    loop_monitor = LoopMonitor(threshold=LOOP_LAG_THRESHOLD)
+
+    @bot.listen("on_connect", once=True)
+    async def start_monitoring():
+        loop_monitor.start()
+        print(f'Event loop: {loop_monitor.loop_name}, logging stalls over {LOOP_LAG_THRESHOLD}s')
+        if metrics_server:
+            await metrics_server.start()
+
+    @bot.event
+    async def on_ready():
+        print(f'We have logged in as {bot.user}')
+        cached = sum(len(guild.members) for guild in bot.guilds)
+        total = sum(guild.member_count or 0 for guild in bot.guilds)
+        print(f'Member cache holds {cached} of {total} members, message cache holds {max_messages or 0} (was {gateway.PREVIOUS_MAX_MESSAGES})')
+
+    cogs = bot.create_group("cogs", "Manage cogs", guild_ids=[GUILD_ID])
+
+    @cogs.command(description="Load a cog")
+    @discord.default_permissions(administrator=True)
+    async def load(ctx, cog_name: discord.Option(str)):
+        try:
+            bot.load_extension(f"cogs.{cog_name}")
+            await ctx.respond(f"Successfully loaded cog `{cog_name}`.")
+        except:
+            await ctx.respond(f"Unable to load cog `{cog_name}`.")
+
+    @cogs.command(description="Unload a cog")
+    @discord.default_permissions(administrator=True)
+    async def unload(ctx, cog_name: discord.Option(str)):
+        try:
+            bot.unload_extension(f"cogs.{cog_name}")
+            await ctx.respond(f"Successfully unloaded cog `{cog_name}`.")
+        except:
+            await ctx.respond(f"Unable to unload cog `{cog_name}`.")
+
+    @cogs.command(description="Reload a cog")
+    @discord.default_permissions(administrator=True)
+    async def reload(ctx, cog_name: discord.Option(str)):
+        try:
+            bot.unload_extension(f"cogs.{cog_name}")
+            bot.load_extension(f"cogs.{cog_name}")
+            await ctx.respond(f"Successfully reloaded cog `{cog_name}`.")
+        except:
+            await ctx.respond(f"Unable to reload cog `{cog_name}`.")
+
+    @bot.slash_command(description="Shutdown the bot", guild_ids=[GUILD_ID])
+    @discord.default_permissions(administrator=True)
+    async def shutdown(ctx):
+        await ctx.respond("Shutting down!")
+        try:
+            # Cogs holding buffered work get to write it out before the loop stops,
+            # one failing write must not keep the others from trying or the bot from closing
+            for cog in list(bot.cogs.values()):
+                if hasattr(cog, "flush"):
+                    try:
+                        await cog.flush()
+                    except Exception as e:
+                        logger.exception(f"Flushing {cog.qualified_name} on shutdown failed: {e}")
+            # The flushes can queue starboard edits of their own, so the queue drains after them
+            await bot.outbound.stop()
+            if metrics_server:
+                await metrics_server.stop()
+        finally:
+            loop_monitor.stop()
+            await bot.close()
+
+    debug = bot.create_group("debug", "Inspect the bot", guild_ids=[GUILD_ID])
+
+    @debug.command(name="metrics", description="Show the bot's metrics")
+    @discord.default_permissions(administrator=True)
+    async def metrics_list(ctx):
+        lines = []
+        for metric in metrics.REGISTRY.values():
+            for labels, value in metric.samples():
+                label_text = ",".join(f"{k}={v}" for k, v in labels.items())
+                if metric.type == "histogram":
+                    value = f"count={value.count} p50={value.percentile(50) * 1000:.1f}ms p99={value.percentile(99) * 1000:.1f}ms"
+                lines.append(f"{metric.name}{{{label_text}}} {value}" if label_text else f"{metric.name} {value}")
+        text = "\n".join(lines) or "No metrics recorded yet."
+        await ctx.respond(f"```\n{text[:1900]}\n```")
+
+    @debug.command(name="handlers", description="Show the slowest event handlers and commands")
+    @discord.default_permissions(administrator=True)
+    async def handlers(ctx, count: discord.Option(int, "How many handlers to show", default=15, min_value=1, max_value=50)):
+        samples = sorted(HANDLER_SECONDS.samples(), key=lambda sample: sample[1].percentile(99), reverse=True)
+        lines = []
+        for labels, histogram in samples[:count]:
+            errors = HANDLER_ERRORS.value(**labels)
+            in_flight = HANDLERS_IN_FLIGHT.value(**labels)
+            lines.append(
+                f"{labels['kind']:<8} {labels['cog']}.{labels['handler']}\n"
+                f"         n={histogram.count} p50={histogram.percentile(50) * 1000:.1f}ms p99={histogram.percentile(99) * 1000:.1f}ms errors={errors} running={in_flight}"
+            )
+        text = "\n".join(lines) or "No handlers have run yet."
+        await ctx.respond(f"```\n{text[:1900]}\n```")
+
+    print(f'Database: {manage.describe_database()}')
+
+    for cog in COG_NAMES:
         print(f'Loading cog: {cog}')
         bot.load_extension(f'cogs.{cog}')
 
-bot.run(TOKEN)
\ No newline at end of file
+    bot.run(TOKEN)
+
+if __name__ == "__main__":
+    main()
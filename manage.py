@@ -2,22 +2,63 @@
 # Posted by NGix
 # Retrieved 2026-02-15, License - CC BY-SA 3.0
 
+import os
 import sys
 import django
 from django.conf import settings
+from dotenv import load_dotenv
 from pathlib import Path
+from urllib.parse import unquote, urlparse
 
 BASE_DIR = Path(__file__).resolve().parent
 
+# main.py imports this module before anything else reads the environment
+load_dotenv()
+
 INSTALLED_APPS = [
     'db',
 ]
 
-DATABASES = {
-    'default': {
+def database_from_env():
+    """Build the default database from DATABASE_URL, falling back to the SQLite file next to this script"""
+    url = urlparse(os.getenv("DATABASE_URL", ""))
+    conn_max_age = os.getenv("DB_CONN_MAX_AGE")
+    if url.scheme in ("postgres", "postgresql"):
+        # Needs psycopg installed, connections are recycled after DB_CONN_MAX_AGE seconds
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': unquote(url.path.lstrip("/")),
+            'USER': unquote(url.username or ""),
+            'PASSWORD': unquote(url.password or ""),
+            'HOST': url.hostname or "",
+            'PORT': url.port or "",
+            'CONN_MAX_AGE': int(conn_max_age or 600),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    if url.scheme not in ("", "sqlite"):
+        raise ValueError(f"Unsupported DATABASE_URL scheme: {url.scheme}")
+    # sqlite:///relative/path or sqlite:////absolute/path
+    name = BASE_DIR / url.path[1:] if url.path[1:] else BASE_DIR / 'db.sqlite3'
+    pragmas = {
+        'journal_mode': os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        'synchronous': os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    }
+    return {
         'ENGINE' : 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': name,
+        # SQLite connections are cheap to keep, None keeps them for the life of their thread
+        'CONN_MAX_AGE': int(conn_max_age) if conn_max_age else None,
+        'OPTIONS': {
+            'init_command': "".join(f"PRAGMA {key}={value};" for key, value in pragmas.items()),
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': float(os.getenv("DB_TIMEOUT", "20")),
+            # Take the write lock when the transaction starts so writers queue instead of deadlocking
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
+
+DATABASES = {
+    'default': database_from_env()
 }
 
 settings.configure(
@@ -27,6 +68,25 @@ settings.configure(
 
 django.setup()
 
+def describe_database():
+    """Connect and report the settings the database is actually running with"""
+    from django.db import connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            values = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f"PRAGMA {pragma}")
+                values[pragma] = cursor.fetchone()[0]
+            # synchronous is reported as a number
+            synchronous = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}.get(values['synchronous'], values['synchronous'])
+            details = f"journal_mode={values['journal_mode']}, synchronous={synchronous}, busy_timeout={values['busy_timeout']}ms"
+        else:
+            cursor.execute("SHOW server_version")
+            details = f"server {cursor.fetchone()[0]}"
+    conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+    persistence = "persistent" if conn_max_age is None else f"conn_max_age={conn_max_age}s"
+    return f"{connection.vendor} {connection.settings_dict['NAME']} ({details}, {persistence})"
+
 if __name__ == "__main__":
     from django.core.management import execute_from_command_line
 
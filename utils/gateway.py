@@ -0,0 +1,38 @@
+import discord
+
+# main.py itself looks up guilds and channels and feeds guild messages to the pipeline and message cache
+BASE_INTENTS = discord.Intents(guilds=True, guild_messages=True)
+
+# What the bot connected with before intents were derived from the cogs, only used to report the savings
+PREVIOUS_INTENTS = discord.Intents.default()
+PREVIOUS_INTENTS.members = True
+PREVIOUS_INTENTS.presences = True
+PREVIOUS_INTENTS.message_content = True
+PREVIOUS_MAX_MESSAGES = 1000
+
+def cog_requirements(modules):
+    """Combine what cog modules declare into (intents, member_cache_flags, max_messages).
+
+    A cog module may set INTENTS (discord.Intents), MEMBER_CACHE
+    (discord.MemberCacheFlags) and MAX_MESSAGES (int). Anything undeclared is
+    assumed unused: no members are cached and the library message cache is off.
+    """
+    intents = discord.Intents.none()
+    intents.value = BASE_INTENTS.value
+    member_cache = discord.MemberCacheFlags.none()
+    max_messages = None
+    for module in modules:
+        declared = getattr(module, "INTENTS", None)
+        if declared:
+            intents.value |= declared.value
+        flags = getattr(module, "MEMBER_CACHE", None)
+        if flags:
+            member_cache.value |= flags.value
+        size = getattr(module, "MAX_MESSAGES", None)
+        if size:
+            max_messages = max(max_messages or 0, size)
+    return intents, member_cache, max_messages
+
+def dropped_intents(intents):
+    """Names of intents the bot used to enable that the cogs no longer need"""
+    return [name for name, enabled in PREVIOUS_INTENTS if enabled and not getattr(intents, name)]
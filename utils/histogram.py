@@ -0,0 +1,54 @@
+import bisect
+
+class LatencyHistogram:
+    """Counts of durations in log-spaced buckets, cheap to merge and good enough for percentiles.
+
+    Bucket bounds grow by 25% from 0.5 ms to about a minute, so any percentile is
+    within one bucket width of the exact value.
+    """
+
+    BOUNDS = tuple(0.0005 * 1.25 ** i for i in range(53))
+
+    def __init__(self):
+        # Sparse bucket index -> count, index len(BOUNDS) holds everything slower
+        self.counts = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.BOUNDS, seconds)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0 to 100) in seconds, None when empty"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            count = self.counts[index]
+            if seen + count >= rank:
+                lower = self.BOUNDS[index - 1] if index else 0.0
+                upper = self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+        return self.BOUNDS[-1]
+
+    def to_dict(self):
+        return {"counts": {str(index): count for index, count in self.counts.items()}, "sum": self.sum}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.count = sum(histogram.counts.values())
+        histogram.sum = data.get("sum", 0.0)
+        return histogram
@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from discord.ext import commands
+from discord import HTTPException
+from discord.utils import MISSING
+from utils import metrics
+import functools, logging, time
+
+HANDLER_SECONDS = metrics.histogram("handler_seconds", "Time event handlers, commands and pipeline stages took", ["kind", "cog", "handler"])
+HANDLER_ERRORS = metrics.counter("handler_errors_total", "Event handlers, commands and pipeline stages that raised", ["kind", "cog", "handler"])
+HANDLERS_IN_FLIGHT = metrics.gauge("handlers_in_flight", "Event handlers, commands and pipeline stages running right now", ["kind", "cog", "handler"])
+REST_SECONDS = metrics.histogram("rest_request_seconds", "Time Discord REST calls took including rate limit retries", ["method", "route"])
+REST_REQUESTS = metrics.counter("rest_requests_total", "Discord REST calls by final status", ["method", "route", "status"])
+RATE_LIMITS = metrics.counter("rest_rate_limits_total", "429 responses from Discord, each one retried after waiting", ["route"])
+GLOBAL_RATE_LIMITS = metrics.counter("rest_global_rate_limits_total", "429 responses that hit Discord's global rate limit")
+
+@contextmanager
+def track(kind, cog, handler):
+    """Time the block and count it as in flight, counting an error if it raises"""
+    labels = dict(kind=kind, cog=cog, handler=handler)
+    HANDLERS_IN_FLIGHT.inc(**labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        HANDLER_ERRORS.inc(**labels)
+        raise
+    finally:
+        HANDLERS_IN_FLIGHT.dec(**labels)
+        HANDLER_SECONDS.observe(time.perf_counter() - start, **labels)
+
+class RateLimitCounter(logging.Handler):
+    """Counts the 429s discord.http retries internally, it only reports them as log warnings"""
+
+    def emit(self, record):
+        if record.msg.startswith("We are being rate limited"):
+            # The bucket is channel_id:guild_id:path, the path is the route template
+            RATE_LIMITS.inc(route=str(record.args[1]).split(":", 2)[-1])
+        elif record.msg.startswith("Global rate limit has been hit"):
+            GLOBAL_RATE_LIMITS.inc()
+
+def owner_name(func):
+    """Class name of a bound method, main for plain functions"""
+    owner = getattr(func, "__self__", None)
+    return type(owner).__name__ if owner is not None else "main"
+
+
+class InstrumentedBot(commands.Bot):
+    """Bot that times every listener and application command it runs.
+
+    Listeners are wrapped when they are added, which covers Cog.listener methods,
+    bot.listen and add_listener alike, and unwrapped again when they are removed.
+    REST calls are counted per route template, so every channel shares one series.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._instrumented = {}
+        super().__init__(*args, **kwargs)
+        self.http.request = self._wrap_request(self.http.request)
+        rate_limits = logging.getLogger("discord.http")
+        if not any(isinstance(handler, RateLimitCounter) for handler in rate_limits.handlers):
+            rate_limits.addHandler(RateLimitCounter(logging.WARNING))
+
+    @staticmethod
+    def _wrap_request(request):
+        @functools.wraps(request)
+        async def wrapper(route, **kwargs):
+            labels = dict(method=route.method, route=route.path)
+            start = time.perf_counter()
+            status = "cancelled"
+            try:
+                data = await request(route, **kwargs)
+                status = "2xx"
+                return data
+            except HTTPException as e:
+                status = str(e.status)
+                raise
+            except Exception as e:
+                status = type(e).__name__
+                raise
+            finally:
+                REST_SECONDS.observe(time.perf_counter() - start, **labels)
+                REST_REQUESTS.inc(status=status, **labels)
+
+        return wrapper
+
+    def add_listener(self, func, name=MISSING):
+        name = func.__name__ if name is MISSING else name
+        wrapper = self._instrumented.get((func, name))
+        if wrapper is None:
+            wrapper = self._instrumented[(func, name)] = self._wrap_listener(func)
+        super().add_listener(wrapper, name)
+
+    def remove_listener(self, func, name=MISSING):
+        name = func.__name__ if name is MISSING else name
+        super().remove_listener(self._instrumented.pop((func, name), func), name)
+
+    @staticmethod
+    def _wrap_listener(func):
+        cog = owner_name(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track("listener", cog, func.__name__):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    async def invoke_application_command(self, ctx):
+        command = ctx.command
+        cog = type(command.cog).__name__ if command.cog else "main"
+        # Command errors are handled inside and never reach track(), they are counted below
+        with track("command", cog, command.qualified_name):
+            await super().invoke_application_command(ctx)
+
+    async def on_application_command_error(self, context, exception):
+        command = context.command
+        cog = type(command.cog).__name__ if command.cog else "main"
+        HANDLER_ERRORS.inc(kind="command", cog=cog, handler=command.qualified_name)
+        await super().on_application_command_error(context, exception)
@@ -0,0 +1,27 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+class KeyedLock:
+    """One asyncio.Lock per key, so work on the same key is serialized while different keys run in parallel.
+
+    Locks are dropped as soon as nobody holds or waits on them, so the map only
+    grows with the number of keys currently in use.
+    """
+
+    def __init__(self):
+        # key -> [lock, number of holders and waiters]
+        self._locks = {}
+
+    @asynccontextmanager
+    async def __call__(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
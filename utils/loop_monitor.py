@@ -0,0 +1,80 @@
+from utils import metrics
+from utils.supervisor import SupervisedTask
+import asyncio, logging, sys, threading, time, traceback
+
+LOOP_LAG = metrics.histogram("event_loop_lag_seconds", "How late the event loop woke up from a short sleep", ["loop"])
+LOOP_STALLS = metrics.counter("event_loop_stalls_total", "Times the event loop was blocked for longer than the stall threshold", ["loop"])
+
+def loop_name(loop):
+    """Short name of the event loop implementation, asyncio or uvloop"""
+    return type(loop).__module__.split(".")[0]
+
+
+class LoopMonitor:
+    """Measures event loop lag and logs what the loop was running when it stalls.
+
+    A task sleeps for interval seconds over and over and records how late it
+    woke up. A watchdog thread checks that those wakeups keep coming, when none
+    has arrived for threshold seconds it logs the loop thread's stack, which
+    points at the synchronous code holding the loop up while it still does.
+    """
+
+    def __init__(self, interval=0.25, threshold=0.5):
+        self.interval = interval
+        self.threshold = threshold
+        self.logger = logging.getLogger(__name__)
+        self.loop_name = None
+        self._loop_thread = None
+        self._last_beat = None
+        self._stopped = threading.Event()
+        self._watchdog = None
+        self._sampler = SupervisedTask("Event loop lag sampler", self._sample)
+
+    def start(self):
+        """Start sampling, call from inside the running loop"""
+        loop = asyncio.get_running_loop()
+        self.loop_name = loop_name(loop)
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._sampler.start()
+        if self._watchdog is None:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, args=(loop,), name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._sampler.cancel()
+        self._stopped.set()
+        self._watchdog = None
+
+    async def _sample(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._last_beat = now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG.observe(lag, loop=self.loop_name)
+            if lag >= self.threshold:
+                self.logger.warning(f"Event loop ({self.loop_name}) was blocked for {lag:.3f}s")
+
+    def _watch(self, loop):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            # A stopped loop or a sampler cancelled on shutdown isn't a stall
+            if not loop.is_running() or not self._sampler.running:
+                continue
+            beat = self._last_beat
+            if time.monotonic() - beat < self.interval + self.threshold or beat == reported:
+                continue
+            # One report per stall, the sampler logs how long it lasted once the loop is free again
+            reported = beat
+            LOOP_STALLS.inc(loop=self.loop_name)
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            task = asyncio.current_task(loop)
+            stack = "".join(traceback.format_stack(frame))
+            self.logger.warning(
+                f"Event loop ({self.loop_name}) blocked for over {self.threshold}s"
+                f" in task {task.get_name() if task else None}, it is running:\n{stack}"
+            )
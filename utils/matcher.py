@@ -0,0 +1,59 @@
+from collections import deque
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that finds any of a set of phrases in one pass over the text"""
+
+    def __init__(self, phrases=()):
+        # goto[state] maps a character to the next state, state 0 is the root
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [False]
+        self.size = 0
+
+        for phrase in phrases:
+            if phrase:
+                self._insert(phrase)
+                self.size += 1
+        self._build_failure_links()
+
+    def _insert(self, phrase):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(False)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._terminal[state] = True
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # A state also matches if any suffix of it is a complete phrase
+                if self._terminal[self._fail[next_state]]:
+                    self._terminal[next_state] = True
+
+    def search(self, text):
+        """Return True if any phrase occurs in text"""
+        goto = self._goto
+        fail = self._fail
+        terminal = self._terminal
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from collections import OrderedDict
+from utils import metrics
+
+CACHE_REQUESTS = metrics.counter("message_cache_requests_total", "Message cache lookups by result", ["result"])
+
+class MessageCache:
+    """Bot-wide cache of fetched messages with a TTL, LRU eviction and shared in-flight fetches.
+
+    Concurrent callers asking for the same message while it is being fetched all
+    await the one REST request instead of sending their own.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        # message_id -> (expires_at, message), least recently used first
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    async def fetch(self, channel, message_id):
+        """Return the message from the cache, fetching it from the channel on a miss"""
+        message_id = int(message_id)
+        entry = self._entries.get(message_id)
+        if entry:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(message_id)
+                CACHE_REQUESTS.inc(result="hit")
+                return entry[1]
+            del self._entries[message_id]
+
+        task = self._inflight.get(message_id)
+        if task:
+            CACHE_REQUESTS.inc(result="shared")
+        else:
+            CACHE_REQUESTS.inc(result="miss")
+            task = asyncio.create_task(self._fetch(channel, message_id))
+            self._inflight[message_id] = task
+        # One caller being cancelled must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, channel, message_id):
+        task = asyncio.current_task()
+        try:
+            message = await channel.fetch_message(message_id)
+        finally:
+            if self._inflight.get(message_id) is task:
+                del self._inflight[message_id]
+            else:
+                # Invalidated while in flight, the result may already be stale
+                task = None
+        if task:
+            self.put(message)
+        return message
+
+    def put(self, message):
+        self._entries[message.id] = (time.monotonic() + self.ttl, message)
+        self._entries.move_to_end(message.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, message_id):
+        message_id = int(message_id)
+        self._entries.pop(message_id, None)
+        self._inflight.pop(message_id, None)
+
+    def stats(self):
+        hits = CACHE_REQUESTS.value(result="hit")
+        shared = CACHE_REQUESTS.value(result="shared")
+        misses = CACHE_REQUESTS.value(result="miss")
+        total = hits + shared + misses
+        return {
+            "size": len(self._entries),
+            "hits": hits,
+            "shared": shared,
+            "misses": misses,
+            "hit_rate": (hits + shared) / total if total else 0.0,
+        }
@@ -0,0 +1,80 @@
+from aiohttp import web
+from utils import metrics
+import logging, math
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def render(registry=None):
+    """Format every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in (metrics.REGISTRY if registry is None else registry).values():
+        help_text = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for labels, value in metric.samples():
+            if metric.type == "histogram":
+                # Buckets are cumulative and every bound is listed so each series keeps the same buckets
+                seen = 0
+                for index, bound in enumerate(value.BOUNDS):
+                    seen += value.counts.get(index, 0)
+                    lines.append(f"{metric.name}_bucket{_labels(labels, le=f'{bound:g}')} {seen}")
+                lines.append(f"{metric.name}_bucket{_labels(labels, le='+Inf')} {value.count}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(value.sum)}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {value.count}")
+            else:
+                lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves the metrics registry over HTTP at /metrics for Prometheus to scrape.
+
+    Collectors are called before each scrape to refresh gauges that are cheaper
+    to read on demand than to keep current, like the gateway latency.
+    """
+
+    def __init__(self, host, port, collectors=()):
+        self.host = host
+        self.port = port
+        self.collectors = list(collectors)
+        self.logger = logging.getLogger(__name__)
+        self._runner = None
+
+    async def start(self):
+        if self._runner:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _metrics(self, request):
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                self.logger.exception(f"Metrics collector {collect.__name__} failed: {e}")
+        # Plain text without a version parameter is read as the 0.0.4 text format
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
@@ -0,0 +1,156 @@
+from utils import metrics
+from utils.supervisor import SupervisedTask
+import asyncio, heapq, itertools, logging, time
+
+# Priority classes, lower runs first
+MODERATION = 0
+ALERT = 1
+COSMETIC = 2
+PRIORITY_NAMES = {MODERATION: "moderation", ALERT: "alert", COSMETIC: "cosmetic"}
+
+QUEUE_DEPTH = metrics.gauge("outbound_queue_depth", "Outbound Discord actions waiting to be sent", ["priority"])
+QUEUE_WAIT = metrics.histogram("outbound_wait_seconds", "Time outbound Discord actions waited in the queue", ["priority"])
+RUNNING = metrics.gauge("outbound_running", "Outbound Discord actions being sent right now", ["priority"])
+COALESCED = metrics.counter("outbound_coalesced_total", "Outbound actions dropped because a newer one with the same key replaced them", ["priority"])
+
+
+class _Entry:
+    def __init__(self, priority, action, key, enqueued_at):
+        self.priority = priority
+        self.action = action
+        self.key = key
+        self.enqueued_at = enqueued_at
+        self.futures = []
+        # Set once the entry runs or is replaced, its heap slot is then skipped
+        self.taken = False
+
+
+class OutboundQueue:
+    """Sends REST actions to Discord in priority order with a cap on how many run at once.
+
+    submit() takes a callable returning an awaitable, like functools.partial(message.edit,
+    content=...), and returns a future for its result. Actions with the same key replace
+    one another while they wait: only the newest runs, moves to the back of its class,
+    and every caller gets its result. Cosmetic actions only ever get half the slots, so a
+    pile of starboard edits sleeping on rate limits can't hold up moderation or alerts.
+    Owners await stop() on shutdown so actions already queued are still sent.
+    """
+
+    def __init__(self, concurrency=8):
+        self.concurrency = concurrency
+        self.logger = logging.getLogger(__name__)
+        self.cosmetic_limit = max(concurrency // 2, 1)
+        self._heap = []
+        self._keyed = {}
+        self._sequence = itertools.count()
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._running = {priority: 0 for priority in PRIORITY_NAMES}
+        # The loop only keeps weak references to tasks, these hold on to the ones sending
+        self._tasks = set()
+        # Set whenever an action is queued or finishes, either may let the next one run
+        self._wake = asyncio.Event()
+        self._task = SupervisedTask("Outbound queue", self._run)
+
+    def __len__(self):
+        return sum(self._depth.values())
+
+    def submit(self, priority, action, key=None):
+        """Queue an action and return a future for what it returns"""
+        self._task.start()
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry(priority, action, key, time.perf_counter())
+        previous = self._keyed.get(key) if key is not None else None
+        if previous:
+            # The newer action supersedes the waiting one, its callers get the newer result
+            COALESCED.inc(priority=PRIORITY_NAMES[previous.priority])
+            previous.taken = True
+            self._count(previous.priority, -1)
+            entry.futures = previous.futures
+            entry.enqueued_at = previous.enqueued_at
+            entry.priority = min(priority, previous.priority)
+        if key is not None:
+            self._keyed[key] = entry
+        entry.futures.append(future)
+        heapq.heappush(self._heap, (entry.priority, next(self._sequence), entry))
+        self._count(entry.priority, 1)
+        self._wake.set()
+        return future
+
+    async def stop(self, timeout=10):
+        """Wait up to timeout seconds for queued and running actions, then stop sending"""
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Outbound queue stopped with {len(self)} action(s) unsent and {len(self._tasks)} still running")
+        finally:
+            self._task.cancel()
+            for task in self._tasks:
+                task.cancel()
+
+    async def _drain(self):
+        while True:
+            # Queued entries finish once their futures resolve, running ones when their task does
+            waiting = [future for _, _, entry in self._heap if not entry.taken for future in entry.futures]
+            waiting.extend(self._tasks)
+            if not waiting:
+                return
+            await asyncio.wait(waiting)
+
+    def _count(self, priority, change):
+        self._depth[priority] += change
+        QUEUE_DEPTH.set(self._depth[priority], priority=PRIORITY_NAMES[priority])
+
+    def _next(self):
+        """Pop the next entry that may run now, None if it has to wait"""
+        while self._heap:
+            entry = self._heap[0][2]
+            if entry.taken:
+                heapq.heappop(self._heap)
+                continue
+            if sum(self._running.values()) >= self.concurrency:
+                return None
+            if entry.priority == COSMETIC and self._running[COSMETIC] >= self.cosmetic_limit:
+                return None
+            heapq.heappop(self._heap)
+            return entry
+        return None
+
+    async def _run(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            entry.taken = True
+            if self._keyed.get(entry.key) is entry:
+                del self._keyed[entry.key]
+            self._count(entry.priority, -1)
+            # Counted before the task starts so the next _next() already sees the slot taken
+            self._running[entry.priority] += 1
+            task = asyncio.create_task(self._execute(entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, entry):
+        name = PRIORITY_NAMES[entry.priority]
+        QUEUE_WAIT.observe(time.perf_counter() - entry.enqueued_at, priority=name)
+        RUNNING.inc(priority=name)
+        try:
+            # Callers that gave up don't need the action anymore
+            if all(future.cancelled() for future in entry.futures):
+                return
+            try:
+                result = await entry.action()
+            except Exception as e:
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in entry.futures:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._running[entry.priority] -= 1
+            RUNNING.dec(priority=name)
+            self._wake.set()
@@ -0,0 +1,48 @@
+import logging
+from utils.instrumentation import owner_name, track
+
+# Stage order, lower runs first
+MODERATION = 10
+BOT_MESSAGES = 20
+CHATTER = 100
+
+class MessageContext:
+    """Per-message data computed once and shared by every stage"""
+
+    def __init__(self, message, bot_user):
+        self.message = message
+        self.content = message.content.lower()
+        self.from_self = message.author.id == bot_user.id
+        self.from_bot = message.author.bot
+        self.is_dm = message.guild is None
+
+
+class MessagePipeline:
+    """Runs registered stages in order for each message until one consumes it.
+
+    A stage is a coroutine taking a MessageContext. Returning True means the
+    message was consumed (for example deleted) and later stages are skipped.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = logging.getLogger(__name__)
+        self._stages = []
+
+    def add_stage(self, name, callback, order):
+        self.remove_stage(name)
+        self._stages.append((order, name, callback))
+        self._stages.sort(key=lambda stage: stage[0])
+
+    def remove_stage(self, name):
+        self._stages = [stage for stage in self._stages if stage[1] != name]
+
+    async def dispatch(self, message):
+        ctx = MessageContext(message, self.bot.user)
+        for _, name, callback in tuple(self._stages):
+            try:
+                with track("stage", owner_name(callback), name):
+                    if await callback(ctx):
+                        return
+            except Exception as e:
+                self.logger.exception(f"Message stage {name} failed: {e}")
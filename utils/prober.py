@@ -0,0 +1,174 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+import aiohttp
+from urllib.parse import urlparse
+from utils.scheduler import Scheduler
+
+# Bodies with at most this much left past max_bytes are read to the end so the connection goes back to the pool
+DRAIN_BYTES = 64 * 1024
+
+def create_session(concurrency):
+    """Pooled session for probes so connections, DNS lookups and TLS sessions are reused"""
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=4, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
+
+async def probe(session, url, timeout, mode="get", expect=None, max_bytes=0):
+    """Check url once, returning (latency, status, error) where error is None if the check passed.
+
+    latency is the time until the response headers arrived, or until the
+    connection was open in tcp mode. get and match look at most at max_bytes of
+    the body. A short rest is drained so the pooled connection is reused, a long
+    one is left unread and the connection dropped instead.
+    """
+    latency = None
+    status = None
+    error = None
+    body = b""
+    start = time.perf_counter()
+    try:
+        if mode == "tcp":
+            await asyncio.wait_for(_tcp_connect(url), timeout)
+            latency = time.perf_counter() - start
+        else:
+            method = session.head if mode == "head" else session.get
+            async with method(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                status = response.status
+                latency = time.perf_counter() - start
+                if mode != "head":
+                    body = await _read_capped(response, max_bytes)
+                    # An unread rest of the body would poison the pooled connection,
+                    # leaving the block releases it when the body was read to the end
+                    if not await _drain(response, len(body), DRAIN_BYTES):
+                        response.close()
+    except asyncio.TimeoutError:
+        error = f"Request timed out after {timeout:g} seconds"
+    except Exception as e:
+        error = f"Request failed with exception: {e}"
+    if not error and (str(status).startswith("5") or str(status).startswith("4")):
+        error = f"Request failed with status code: {status}"
+    if not error and mode == "match" and expect.encode() not in body:
+        error = f"Expected text not found in the first {max_bytes} bytes"
+    return latency, status, error
+
+async def _tcp_connect(url):
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    _, writer = await asyncio.open_connection(parsed.hostname, port)
+    writer.close()
+
+async def _read_capped(response, max_bytes):
+    """Read up to max_bytes of the body"""
+    chunks = []
+    remaining = max_bytes
+    while remaining > 0:
+        chunk = await response.content.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+async def _drain(response, read, budget):
+    """Read and discard the rest of the body if it fits in budget, True if it was read to the end"""
+    if response.content.at_eof():
+        return True
+    # Don't start downloading a body that is known to be too long
+    if response.content_length is not None and response.content_length - read > budget:
+        return False
+    while budget > 0:
+        chunk = await response.content.read(budget)
+        if not chunk:
+            break
+        budget -= len(chunk)
+    return response.content.at_eof()
+
+
+class ProberProcess:
+    """Runs the probes in a child process and streams every result back.
+
+    The child has its own event loop, connection pool and scheduler, so slow
+    handshakes and response bodies never hold up the bot's event loop. It is
+    spawned rather than forked so it inherits none of the bot's state.
+    """
+
+    def __init__(self, concurrency, jitter):
+        context = multiprocessing.get_context("spawn")
+        self._commands = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(
+            target=_worker_main,
+            args=(self._commands, self._results, concurrency, jitter),
+            name="status-prober",
+            daemon=True
+        )
+
+    def start(self):
+        self._process.start()
+
+    def schedule(self, monitor_id, interval, settings):
+        """Add a monitor or replace its settings, which are keyword arguments for probe()"""
+        self._commands.put(("schedule", monitor_id, interval, settings))
+
+    def unschedule(self, monitor_id):
+        self._commands.put(("unschedule", monitor_id))
+
+    def stop(self):
+        if self._process.is_alive():
+            self._commands.put(None)
+
+    async def results(self):
+        """Yield (monitor_id, timestamp, duration, latency, status, error) as the child reports them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                yield await loop.run_in_executor(None, self._results.get, True, 1)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError(f"Prober process exited with code {self._process.exitcode}")
+
+
+def _worker_main(commands, results, concurrency, jitter):
+    asyncio.run(_worker(commands, results, concurrency, jitter))
+
+async def _worker(commands, results, concurrency, jitter):
+    loop = asyncio.get_running_loop()
+    parent = multiprocessing.parent_process()
+    monitors = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    session = create_session(concurrency)
+
+    async def check(monitor_id):
+        if monitor_id not in monitors:
+            return
+        start = time.perf_counter()
+        async with semaphore:
+            latency, status, error = await probe(session, **monitors[monitor_id])
+        results.put((monitor_id, time.time(), time.perf_counter() - start, latency, status, error))
+
+    scheduler = Scheduler(check, jitter)
+    runner = asyncio.create_task(scheduler.run())
+    try:
+        while True:
+            try:
+                command = await loop.run_in_executor(None, commands.get, True, 5)
+            except queue.Empty:
+                # Don't outlive a bot that was killed without stopping us
+                if not parent.is_alive():
+                    break
+                continue
+            if command is None:
+                break
+            if command[0] == "schedule":
+                _, monitor_id, interval, settings = command
+                monitors[monitor_id] = settings
+                if scheduler.interval(monitor_id) != interval:
+                    scheduler.schedule(monitor_id, interval)
+            else:
+                monitors.pop(command[1], None)
+                scheduler.unschedule(command[1])
+    finally:
+        runner.cancel()
+        scheduler.cancel_running()
+        await session.close()
@@ -0,0 +1,122 @@
+import bisect
+import heapq
+import time
+
+class Ranking:
+    """Keys kept sorted by score, highest first, so reading a page never looks at the rest"""
+
+    def __init__(self):
+        self._scores = {}
+        # Sorted (-score, key) pairs, ties broken by the smaller key
+        self._order = []
+
+    def __len__(self):
+        return len(self._order)
+
+    def score(self, key):
+        return self._scores.get(key, 0)
+
+    def set(self, key, score):
+        self.discard(key)
+        self._scores[key] = score
+        bisect.insort(self._order, (-score, key))
+
+    def add(self, key, amount):
+        """Change a key's score by amount, dropping it once the score reaches zero"""
+        score = self.score(key) + amount
+        if score > 0:
+            self.set(key, score)
+        else:
+            self.discard(key)
+
+    def discard(self, key):
+        score = self._scores.pop(key, None)
+        if score is not None:
+            index = bisect.bisect_left(self._order, (-score, key))
+            del self._order[index]
+
+    def page(self, offset, limit):
+        """Return (key, score) pairs ranked offset + 1 to offset + limit"""
+        return [(key, -score) for score, key in self._order[offset:offset + limit]]
+
+
+class LeaderboardWindow:
+    """Message, author and channel rankings over the messages created within a rolling window"""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.messages = Ranking()
+        self.authors = Ranking()
+        self.channels = Ranking()
+        # message_id -> (stars, author_id, channel_id)
+        self._entries = {}
+        # (created_at, message_id) heap, so expiring old messages only touches those messages
+        self._expiry = []
+
+    def update(self, message_id, stars, created_at, author_id, channel_id, now):
+        if self.seconds is not None and created_at < now - self.seconds:
+            self.remove(message_id)
+            return
+        previous = self._entries.get(message_id)
+        if previous:
+            self._remove_totals(*previous)
+        elif self.seconds is not None:
+            heapq.heappush(self._expiry, (created_at, message_id))
+        self._entries[message_id] = (stars, author_id, channel_id)
+        self.messages.set(message_id, stars)
+        if author_id is not None:
+            self.authors.add(author_id, stars)
+        self.channels.add(channel_id, stars)
+
+    def remove(self, message_id):
+        previous = self._entries.pop(message_id, None)
+        if previous:
+            self._remove_totals(*previous)
+            self.messages.discard(message_id)
+
+    def _remove_totals(self, stars, author_id, channel_id):
+        if author_id is not None:
+            self.authors.add(author_id, -stars)
+        self.channels.add(channel_id, -stars)
+
+    def expire(self, now):
+        if self.seconds is None:
+            return
+        cutoff = now - self.seconds
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, message_id = heapq.heappop(self._expiry)
+            self.remove(message_id)
+
+
+class Leaderboard:
+    """Starboard rankings for every time window, updated one message at a time"""
+
+    WINDOWS = {
+        "all-time": None,
+        "month": 30 * 24 * 60 * 60,
+        "week": 7 * 24 * 60 * 60,
+    }
+
+    def __init__(self):
+        self.windows = {name: LeaderboardWindow(seconds) for name, seconds in self.WINDOWS.items()}
+        # message_id -> (author_id, channel_id, starboard_message_id)
+        self._info = {}
+
+    def update(self, message_id, stars, created_at, author_id, channel_id, starboard_message_id):
+        now = time.time()
+        self._info[message_id] = (author_id, channel_id, starboard_message_id)
+        for window in self.windows.values():
+            window.update(message_id, stars, created_at, author_id, channel_id, now)
+
+    def remove(self, message_id):
+        self._info.pop(message_id, None)
+        for window in self.windows.values():
+            window.remove(message_id)
+
+    def info(self, message_id):
+        return self._info.get(message_id)
+
+    def window(self, name):
+        window = self.windows[name]
+        window.expire(time.time())
+        return window
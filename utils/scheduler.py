@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+import itertools
+import random
+
+class Scheduler:
+    """Calls callback(key) every interval seconds per key, driven by a heap of due times.
+
+    Only keys that are due are touched on each wake-up, so many keys with long
+    intervals cost nothing between their runs. Each run is jittered by a fraction
+    of the interval so keys added together don't all fire together.
+    """
+
+    def __init__(self, callback, jitter=0.1):
+        self.callback = callback
+        self.jitter = jitter
+        # (due, sequence, key, generation), stale items are skipped when popped
+        self._heap = []
+        self._sequence = itertools.count()
+        self._intervals = {}
+        self._generations = {}
+        self._running = {}
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def schedule(self, key, interval):
+        """Add a key or change its interval, its first run lands somewhere within one interval"""
+        loop = asyncio.get_running_loop()
+        self._intervals[key] = interval
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._push(key, loop.time() + random.uniform(0, interval))
+
+    def interval(self, key):
+        return self._intervals.get(key)
+
+    def unschedule(self, key):
+        self._intervals.pop(key, None)
+        self._generations.pop(key, None)
+
+    def _push(self, key, due):
+        heapq.heappush(self._heap, (due, next(self._sequence), key, self._generations[key]))
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def _next_due(self, key, now):
+        interval = self._intervals[key]
+        return now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, key, generation = heapq.heappop(self._heap)
+                if self._generations.get(key) != generation:
+                    continue
+                self._push(key, self._next_due(key, now))
+                # A run that is still going when the key is due again is not doubled up
+                if key not in self._running:
+                    self._running[key] = asyncio.create_task(self._run_callback(key))
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_callback(self, key):
+        try:
+            await self.callback(key)
+        finally:
+            self._running.pop(key, None)
+
+    def cancel_running(self):
+        for task in self._running.values():
+            task.cancel()
+        self._running.clear()
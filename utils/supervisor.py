@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+
+class SupervisedTask:
+    """Keeps exactly one copy of a long-running coroutine alive.
+
+    start() is a no-op while the task runs, so it is safe to call from on_ready
+    which fires again on every reconnect. A crash is logged and the coroutine is
+    restarted with exponential backoff until cancel() is called.
+    """
+
+    def __init__(self, name, factory, restart_delay=5, max_restart_delay=300):
+        self.name = name
+        self.factory = factory
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.logger = logging.getLogger(__name__)
+        self._task = None
+        self.started_at = None
+        self.restarts = 0
+        self.last_error = None
+        # Reported by the supervised coroutine through record_run()
+        self.last_run_at = None
+        self.last_run_duration = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return False
+        self.started_at = time.time()
+        self._task = asyncio.create_task(self._supervise(), name=self.name)
+        return True
+
+    def cancel(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def record_run(self, duration):
+        self.last_run_at = time.time()
+        self.last_run_duration = duration
+
+    async def _supervise(self):
+        delay = self.restart_delay
+        while True:
+            try:
+                await self.factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = repr(e)
+                self.restarts += 1
+                self.logger.exception(f"{self.name} crashed, restarting in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
@@ -0,0 +1,59 @@
+from collections import deque
+from utils.histogram import LatencyHistogram
+
+class Bucket:
+    """Probe results over one time bucket: probe and failure counts plus a latency histogram"""
+
+    def __init__(self, start):
+        self.start = start
+        self.probes = 0
+        self.failures = 0
+        self.latency = LatencyHistogram()
+
+    def add(self, ok, latency):
+        self.probes += 1
+        if not ok:
+            self.failures += 1
+        if latency is not None:
+            self.latency.observe(latency)
+
+    def merge(self, other):
+        self.probes += other.probes
+        self.failures += other.failures
+        self.latency.merge(other.latency)
+
+    @property
+    def uptime(self):
+        """Share of successful probes from 0 to 1, None without probes"""
+        if not self.probes:
+            return None
+        return (self.probes - self.failures) / self.probes
+
+
+class ProbeSeries:
+    """Recent raw samples of one monitor and the minute bucket they are rolled up into"""
+
+    def __init__(self, raw_size=360):
+        # (timestamp, ok, latency, status) tuples, oldest dropped first
+        self.raw = deque(maxlen=raw_size)
+        self.open_bucket = None
+
+    def append(self, timestamp, ok, latency, status):
+        """Record a probe, returning the previous minute bucket if this sample closed it"""
+        self.raw.append((timestamp, ok, latency, status))
+        start = timestamp.replace(second=0, microsecond=0)
+        closed = None
+        if self.open_bucket and self.open_bucket.start != start:
+            closed = self.open_bucket
+            self.open_bucket = None
+        if self.open_bucket is None:
+            self.open_bucket = Bucket(start)
+        self.open_bucket.add(ok, latency)
+        return closed
+
+    def close_before(self, start):
+        """Return and clear the open bucket if it started before start"""
+        if self.open_bucket and self.open_bucket.start < start:
+            closed, self.open_bucket = self.open_bucket, None
+            return closed
+        return None